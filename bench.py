@@ -0,0 +1,214 @@
+# Offline benchmark for the scrapers and the alignment pipeline.
+#
+# Runs every stage on the saved pages in fixtures/ and on synthetic pages with
+# 15/100/1000 games, and reports wall time, peak traced memory and net
+# allocated blocks per stage. Nothing here launches Chrome.
+#
+#   python bench.py                          # print the table
+#   python bench.py --json before.json       # save results for this commit
+#   python bench.py --compare before.json    # flag stages that got slower
+import argparse
+import gc
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import briansnake
+from check_fixtures import load_fixture
+
+SIZES = [15, 100, 1000]
+REGRESSION_RATIO = 1.25  # --compare flags stages at least this much slower
+MIN_RUN_TIME = 0.2  # seconds each stage is repeated for when timing
+
+NICKNAMES = [
+    'Yankees', 'Red Sox', 'Dodgers', 'Giants', 'Athletics', 'Mariners', 'Cubs', 'Cardinals',
+    'Braves', 'Mets', 'Astros', 'Rangers', 'Padres', 'Rockies', 'Twins', 'Guardians',
+]
+
+
+def synthetic_games(n, seed=0):
+    # n matchups with prices and spread/total lines; team names stay unique so
+    # every book can be aligned
+    rng = random.Random(seed)
+    games = []
+    for i in range(n):
+        t1 = f'{NICKNAMES[(2 * i) % len(NICKNAMES)]} {i}'
+        t2 = f'{NICKNAMES[(2 * i + 1) % len(NICKNAMES)]} {i}'
+        prices = [rng.choice((-1, 1)) * rng.randint(100, 250) for _ in range(6)]
+        spread = rng.choice((-2.5, -1.5, 1.5, 2.5))
+        total = rng.choice((7, 7.5, 8, 8.5, 9))
+        lines = [f'{spread:+g}', f'O {total:g}', '', f'{-spread:+g}', f'U {total:g}', '']
+        games.append((t1, t2, [f'{p:+d}' for p in prices], lines))
+    return games
+
+
+def synth_draftkings(games):
+    rows = []
+    for t1, t2, p, lines in games:
+        for team, prices, points in ((t1, p[:3], lines[:3]), (t2, p[3:], lines[3:])):
+            cells = ''.join(
+                '<td><div class="sportsbook-outcome-cell__body">'
+                + (f'<span class="sportsbook-outcome-cell__line">{line.split()[-1]}</span>' if line else '')
+                + f'<span class="sportsbook-odds american default-color">{price.replace("-", "−")}</span></div></td>'
+                for price, line in zip(prices, points))
+            rows.append(f'<tr><th><div class="event-cell__name-text">CTY {team}</div></th>{cells}</tr>')
+    return f'<html><body><table class="sportsbook-table"><tbody>{"".join(rows)}</tbody></table></body></html>'
+
+
+def synth_betmgm(games):
+    events = []
+    for i, (t1, t2, p, lines) in enumerate(games):
+        if i % 3 == 0:  # list some matchups the other way round, like the real page (totals stay over/under)
+            t1, t2 = t2, t1
+            p = [p[3], p[1], p[5], p[0], p[4], p[2]]
+            lines = [lines[3], lines[1], lines[5], lines[0], lines[4], lines[2]]
+        columns = [(p[0], lines[0]), (p[3], lines[3]), (p[1], lines[1]), (p[4], lines[4]), (p[2], lines[2]), (p[5], lines[5])]
+        groups = ''.join(
+            '<ms-option-group class="grid-option-group grid-group two-column ng-star-inserted">' + ''.join(
+                '<ms-option><ms-event-pick>' + (f'<div class="name ng-star-inserted">{line}</div>' if line else '')
+                + f'<div class="option-value"><span class="custom-odds-value-style ng-star-inserted">{price}</span></div></ms-event-pick></ms-option>'
+                for price, line in columns[k:k + 2]) + '</ms-option-group>'
+            for k in (0, 2, 4))
+        events.append(
+            '<ms-six-pack-event class="grid-event grid-six-pack-event ms-active-highlight two-lined-name ng-star-inserted">'
+            f'<div class="participant"> {t1} </div><div class="participant"> {t2} </div>{groups}</ms-six-pack-event>')
+    return f'<html><body><ms-grid>{"".join(events)}</ms-grid></body></html>'
+
+
+def synth_fanduel(games, tagged=True):
+    attr = ' data-test="event-card"' if tagged else ''
+    name = '<span data-test="participant-name">{}</span>' if tagged else '<span>{}</span>'
+    events = ''.join(
+        f'<li><div{attr} class="af"><div class="ai"><a>{name.format(t1)}{name.format(t2)}</a></div>'
+        f'<div class="al"><div role="button"><span>{p[2]}</span></div><div role="button"><span>{p[5]}</span></div></div></div></li>'
+        for t1, t2, p, _ in games)
+    return f'<html><body><div id="root"><div class="a"><ul>{events}</ul></div></div></body></html>'
+
+
+def pages_for(size):
+    # {page name: (site, html)} for a size, or the saved fixtures for 'fixture'
+    if size == 'fixture':
+        return {
+            'draftkings': ('draftkings', load_fixture('draftkings.html')),
+            'betmgm': ('betmgm', load_fixture('betmgm.html')),
+            'fanduel': ('fanduel', load_fixture('fanduel.html')),
+            'fanduel_fallback': ('fanduel', load_fixture('fanduel_fallback.html')),
+        }
+    games = synthetic_games(size)
+    return {
+        'draftkings': ('draftkings', synth_draftkings(games)),
+        'betmgm': ('betmgm', synth_betmgm(games)),
+        'fanduel': ('fanduel', synth_fanduel(games)),
+        'fanduel_fallback': ('fanduel', synth_fanduel(games, tagged=False)),
+    }
+
+
+def stages_for(size):
+    # [(stage name, zero-argument callable)] covering parse, scrape, align and 3-way blocks
+    pages = pages_for(size)
+    stages = []
+    for page, (site, html) in pages.items():
+        soup = BeautifulSoup(html, 'lxml')
+        stages.append((f'soup {page}', lambda html=html: BeautifulSoup(html, 'lxml')))
+        stages.append((f'scrape_{site} {page}', lambda site=site, soup=soup: briansnake.SCRAPERS[site](soup)))
+        stages.append((f'lxml {page}', lambda site=site, html=html: briansnake.parse_page(site, html, backend='lxml')))
+    games_dk = briansnake.parse_page('draftkings', pages['draftkings'][1])
+    games_bm = briansnake.parse_page('betmgm', pages['betmgm'][1])
+    games_fd = briansnake.parse_page('fanduel', pages['fanduel'][1])
+    aligned_bm = briansnake.align_betmgm_to_draftkings(games_dk, games_bm)
+    aligned_fd = briansnake.align_betmgm_to_draftkings(games_dk, games_fd)
+    stages.append(('align betmgm', lambda: briansnake.align_betmgm_to_draftkings(games_dk, games_bm)))
+    stages.append(('align fanduel', lambda: briansnake.align_betmgm_to_draftkings(games_dk, games_fd)))
+    stages.append(('blocks_3way', lambda: briansnake.get_moneyline_game_blocks_3way(games_dk, aligned_bm, aligned_fd)))
+    others = {'betmgm': games_bm, 'fanduel': games_fd}
+    stages.append(('align_books', lambda: briansnake.align_books(games_dk, others)))
+    results = dict(others, draftkings=games_dk)
+    prices = briansnake.stack_moneylines([games_dk, aligned_bm, aligned_fd])
+    stages.append(('stack_moneylines', lambda: briansnake.stack_moneylines([games_dk, aligned_bm, aligned_fd])))
+    stages.append(('evaluate_moneylines', lambda: briansnake.evaluate_moneylines(prices)))
+    rows = [games_dk, aligned_bm, aligned_fd]
+    quotes, lines = briansnake.stack_markets(rows)
+    markets = briansnake.evaluate_markets(quotes, lines)
+    stages.append(('stack_markets', lambda: briansnake.stack_markets(rows)))
+    stages.append(('evaluate_markets', lambda: briansnake.evaluate_markets(quotes, lines)))
+    stages.append(('market_summaries', lambda: briansnake.market_summaries(markets, briansnake.BOOKS, rows)))
+    stages.append(('build_moneyline_games', lambda: briansnake.build_moneyline_games(results)))
+    return stages
+
+
+def measure(fn):
+    # Median wall time over repeated runs, then one traced run for memory
+    runs = []
+    deadline = time.perf_counter() + MIN_RUN_TIME
+    while len(runs) < 3 or (time.perf_counter() < deadline and len(runs) < 1000):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del result
+    return {'ms': statistics.median(runs) * 1000, 'peak_kib': peak / 1024, 'blocks': blocks, 'runs': len(runs)}
+
+
+def run(sizes, only=None):
+    results = {}
+    for size in sizes:
+        for stage, fn in stages_for(size):
+            if only and only not in stage:
+                continue
+            key = f'{size}:{stage}'
+            results[key] = measure(fn)
+            r = results[key]
+            print(f"{str(size):>8} {stage:40} {r['ms']:10.3f} ms {r['peak_kib']:10.1f} KiB peak {r['blocks']:8} blocks")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline.get('revision') or 'unknown revision'})")
+    regressions = 0
+    for key, r in results.items():
+        old = baseline['results'].get(key)
+        if not old:
+            continue
+        ratio = r['ms'] / old['ms'] if old['ms'] else float('inf')
+        flag = 'SLOWER' if ratio >= REGRESSION_RATIO else ''
+        regressions += bool(flag)
+        print(f"{key:50} {old['ms']:10.3f} -> {r['ms']:10.3f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline scraper/alignment benchmark')
+    parser.add_argument('--sizes', default='fixture,' + ','.join(map(str, SIZES)),
+                        help='comma-separated game counts, plus "fixture" for the saved pages')
+    parser.add_argument('--only', help='only run stages whose name contains this')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='compare against a file written by --json')
+    args = parser.parse_args()
+    sizes = [s if s == 'fixture' else int(s) for s in args.sizes.split(',')]
+    results = run(sizes, args.only)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'revision': git_revision(), 'time': time.time(), 'results': results}, f, indent=1)
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare) else 0)
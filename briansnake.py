@@ -3,71 +3,273 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
-from flask import Flask, render_template_string
+import lxml.html
+from lxml import etree
+import numpy as np
+import flask
+from flask import Flask, Response, render_template_string, request
 import threading
+import queue
 import time
+import json
+import math
+import re
+import base64
+import hashlib
+import os
+import gzip
+from array import array
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from tickstore import TickStore
+from recorder import Recorder
+from metrics import Registry, BYTES_BUCKETS
 
 
-def conv(odds):
-    odds = int(odds)
-    if odds > 0:
-        prob = 100 / (odds + 100)
-    else:
-        prob = -odds / (-odds + 100)
-    return prob * 100
-
+# Browser profiles. 'full' is a visible, unrestricted Chrome for debugging;
+# 'lean' runs headless and refuses everything the odds don't need.
+BLOCKED_RESOURCES = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.avif',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.css', '*.mp4', '*.webm', '*.m3u8',
+]
+BLOCKED_TRACKERS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*segment.io*', '*segment.com/analytics*',
+    '*optimizely.com*', '*nr-data.net*', '*newrelic.com*', '*browser-intake-datadoghq.com*',
+    '*quantserve.com*', '*scorecardresearch.com*', '*adsrvr.org*', '*bing.com/bat*', '*tiktok.com/i18n/pixel*',
+]
+BROWSER_PROFILES = {
+    'full': {'headless': False, 'blocked_urls': [], 'block_images': False, 'args': []},
+    'lean': {
+        'headless': True,
+        'blocked_urls': BLOCKED_RESOURCES + BLOCKED_TRACKERS,
+        'block_images': True,
+        'args': [
+            '--disable-extensions', '--renderer-process-limit=2', '--disable-background-networking',
+            '--disable-component-update', '--disable-default-apps', '--disable-sync', '--mute-audio',
+            '--no-first-run', '--window-size=1280,2000',
+            # Tabs in the background must keep running their odds updates
+            '--disable-background-timer-throttling', '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+        ],
+    },
+}
+BROWSER_PROFILE = 'lean'
 
-def get_soup(url):
+def chrome_options_for(profile, network_capture=False):
+    config = BROWSER_PROFILES[profile]
     chrome_options = Options()
-    # chrome_options.add_argument('--headless')  # Commented out for debugging
+    if config['headless']:
+        chrome_options.add_argument('--headless=new')
     chrome_options.add_argument('--disable-gpu')
     chrome_options.add_argument('--no-sandbox')
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    for arg in config['args']:
+        chrome_options.add_argument(arg)
+    if config['block_images']:
+        chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    if network_capture:
+        enable_network_capture(chrome_options)
+    return chrome_options
+
+def enable_network_capture(chrome_options):
+    # Network.* events of every tab go to the session's performance log (see read_feed)
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+# Resolved once per process. Set CHROMEDRIVER_PATH to skip webdriver-manager's
+# network lookup entirely.
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')
+chromedriver_lock = threading.Lock()
+
+def chromedriver_path():
+    global CHROMEDRIVER_PATH
+    with chromedriver_lock:
+        if not CHROMEDRIVER_PATH:
+            CHROMEDRIVER_PATH = ChromeDriverManager().install()
+        return CHROMEDRIVER_PATH
+
+def new_driver(profile=None, network_capture=False):
+    profile = profile or BROWSER_PROFILE
+    driver = webdriver.Chrome(service=Service(chromedriver_path()),
+                              options=chrome_options_for(profile, network_capture))
+    blocked = BROWSER_PROFILES[profile]['blocked_urls']
+    if blocked:
+        # Requests matching these never leave the browser, on every page the driver loads
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+    return driver
+
+# CSS selector that appears once a book's odds have rendered
+READY_SELECTORS = {
+    'draftkings': '.sportsbook-odds',
+    'betmgm': 'ms-six-pack-event .custom-odds-value-style',
+    'fanduel': 'div[data-test*="event"], div[role="button"] span',
+}
+READY_TIMEOUT = 20  # seconds to wait for odds before scraping whatever is there
+
+def wait_for_odds(driver, site, timeout=READY_TIMEOUT):
+    # True once the book's odds are in the DOM, False on timeout
+    selector = READY_SELECTORS.get(site)
+    try:
+        if selector:
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+                expected_conditions.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        else:
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete')
+        return True
+    except TimeoutException:
+        return False
+
+def get_soup(url):
+    driver = new_driver()
     driver.get(url)
-    time.sleep(2)
+    wait_for_odds(driver, next((site for site, u in URLS.items() if u == url), None))
     html = driver.page_source
     soup = BeautifulSoup(html, 'lxml')
     driver.quit()
     return soup
 
 
+MISSING = 0  # American odds are never 0, so 0 marks an empty slot
+MONEYLINE_SLOTS = (2, 5)  # team1 / team2 moneyline in the six-slot layout
+NO_LINE = float('nan')  # line of a slot without points: moneylines, or a spread/total the page didn't show
+
+
+def parse_american(text):
+    # '+150', '-110' or '−110' -> int, anything else -> MISSING
+    try:
+        return int(text.strip().replace('−', '-'))
+    except (AttributeError, ValueError):
+        return MISSING
+
+
+def parse_line(text):
+    # Points of a spread or total cell: '-1.5', '+1½', 'O 8.5', 'U 9', 'PK' -> float, anything else -> NO_LINE.
+    # Totals lose their O/U; the slot says which side it is.
+    text = re.sub(r'^[OoUu][a-z]*\s*', '', (text or '').strip()).replace('−', '-').replace('½', '.5')
+    if text.lower() in ('pk', "pick'em", 'pick'):
+        return 0.0
+    try:
+        return float(text) + 0.0  # + 0.0 turns '-0' into 0.0
+    except ValueError:
+        return NO_LINE
+
+
+def same_line(a, b):
+    return a == b or (a != a and b != b)  # NO_LINE is NaN, which equals nothing
+
+
+def format_american(price):
+    return f'{price:+d}' if price else ''
+
+
+class Game:
+    # One book's quotes for one matchup, in the scrapers' six-slot layout:
+    # team1 spread/total/moneyline, then team2 spread/total/moneyline.
+    # Prices and spread/total points (lines) are parsed once, when the page is
+    # scraped; implied probabilities are worked out from the prices in bulk by
+    # evaluate_moneylines / evaluate_markets.
+    # changed holds, per slot, the wall time the quote last moved (see stamp_quotes).
+    __slots__ = ('team1', 'team2', 'prices', 'lines', 'changed')
+
+    def __init__(self, team1, team2, prices, lines=None):
+        self.team1 = team1
+        self.team2 = team2
+        self.prices = array('i', prices)
+        self.lines = array('d', lines if lines is not None else [NO_LINE] * 6)
+        self.changed = None
+
+    def text(self, slot):
+        return format_american(self.prices[slot])
+
+    def __eq__(self, other):
+        return (isinstance(other, Game) and self.team1 == other.team1 and self.team2 == other.team2
+                and self.prices == other.prices and self.lines.tobytes() == other.lines.tobytes())
+
+    def __repr__(self):
+        return f"Game({self.team1!r}, {self.team2!r}, {self.prices.tolist()}, {self.lines.tolist()})"
+
+    def __reduce__(self):
+        # Pickle only names, prices and lines (e.g. back from a parse worker)
+        return Game, (self.team1, self.team2, self.prices, self.lines)
+
+
+def games_from_slots(names, odds, lines=()):
+    # Two team names and six odds strings per game, as the DraftKings and BetMGM
+    # scrapers read them, and optionally the six line strings next to them
+    games = []
+    for i in range(len(names) // 2):
+        prices = [parse_american(o) for o in odds[i*6:i*6+6]]
+        prices += [MISSING] * (6 - len(prices))
+        points = [parse_line(text) for text in lines[i*6:i*6+6]]
+        points += [NO_LINE] * (6 - len(points))
+        games.append(Game(names[i*2].strip(), names[i*2+1].strip(), prices, points))
+    return games
+
+
+def games_from_moneylines(names, odds):
+    # Two team names and two moneyline odds strings per game (FanDuel's page)
+    games = []
+    for i in range(len(names) // 2):
+        prices = [MISSING] * 6
+        for team, slot in enumerate(MONEYLINE_SLOTS):
+            if i*2+team < len(odds):
+                prices[slot] = parse_american(odds[i*2+team])
+        games.append(Game(names[i*2].strip(), names[i*2+1].strip(), prices))
+    return games
+
+
+# Remove city prefix from team names, except for 'Athletics'
+def strip_city(name):
+    name = name.strip()
+    if name == 'Athletics':
+        return name
+    parts = name.split(' ', 1)
+    if len(parts) == 2:
+        return parts[1]
+    return name
+
+
 def scrape_draftkings(soup):
     teams = soup.find_all('div', class_='event-cell__name-text')
     odds = []
-    # Remove city prefix from team names, except for 'Athletics'
-    def strip_city(name):
-        name = name.strip()
-        if name == 'Athletics':
-            return name
-        parts = name.split(' ', 1)
-        if len(parts) == 2:
-            return parts[1]
-        return name
-    # Find all odds and empty cells in order
+    lines = []
+    line = ''  # points of the cell being read; they come just before its odds
+    # Find all odds, lines and empty cells in order
     odds_and_empty = soup.find_all(['span', 'div'], class_=[
         'sportsbook-odds', 'sportsbook-odds american', 'sportsbook-odds american default-color',
-        'sportsbook-odds american no-margin default-color', 'sportsbook-empty-cell body'])
+        'sportsbook-odds american no-margin default-color', 'sportsbook-empty-cell body',
+        'sportsbook-outcome-cell__line'])
     for el in odds_and_empty:
-        if 'sportsbook-empty-cell' in el.get('class', []):
+        if 'sportsbook-outcome-cell__line' in el.get('class', []):
+            line = el.text.strip()
+        elif 'sportsbook-empty-cell' in el.get('class', []):
             odds.append('')  # Represent empty cell as empty string
+            lines.append('')
+            line = ''
         elif 'sportsbook-odds' in el.get('class', []):
             text = el.text.strip()
             if text and (text[0] == '+' or text[0] == '-' or text[0] == '−'):
                 # Replace Unicode minus sign with ASCII hyphen-minus
                 text = text.replace('−', '-')
                 odds.append(text)
-    # Return stripped team names as objects with .text attribute for compatibility
-    class FakeTag:
-        def __init__(self, text):
-            self.text = text
-    teams = [FakeTag(strip_city(t.text)) for t in teams]
-    return teams, odds
+                lines.append(line)
+            line = ''
+    return games_from_slots([strip_city(t.text) for t in teams], odds, lines)
 
 
 def scrape_betmgm(soup):
     teams = []
     odds = []
+    lines = []
     event_blocks = soup.find_all(
         'ms-six-pack-event',
         class_='grid-event grid-six-pack-event ms-active-highlight two-lined-name ng-star-inserted'
@@ -77,20 +279,31 @@ def scrape_betmgm(soup):
         odds_and_empty = block.find_all(['span', 'div', 'ms-option-group'], class_=[
             'custom-odds-value-style ng-star-inserted',
             'offline option-indicator',
-            'grid-option-group grid-group offline suspended-lock-box two-column ng-star-inserted'
+            'grid-option-group grid-group offline suspended-lock-box two-column ng-star-inserted',
+            'name'
         ])
         local_odds = []
+        local_lines = []
+        line = ''  # a pick's points ('-1.5', 'O 8.5') come just before its odds
         for el in odds_and_empty:
             classes = el.get('class', [])
             if 'option-indicator' in classes and 'offline' in classes:
                 local_odds.append('')  # Skip one spot
+                local_lines.append('')
+                line = ''
             elif 'grid-option-group' in classes and 'offline' in classes:
                 local_odds.append('')
                 local_odds.append('')  # Skip two spots
+                local_lines += ['', '']
+                line = ''
             elif 'custom-odds-value-style' in classes:
                 text = el.text.strip()
                 if text and (text[0] == '+' or text[0] == '-'):
                     local_odds.append(text)
+                    local_lines.append(line)
+                line = ''
+            elif el.name == 'div' and 'name' in classes:
+                line = el.text.strip()
         # Reorder every 6 odds from 123456 to 135246 (column to row order)
         for i in range(0, len(local_odds), 6):
             group = local_odds[i:i+6]
@@ -98,25 +311,71 @@ def scrape_betmgm(soup):
                 # 1 2 3 4 5 6 -> 1 3 5 2 4 6
                 reordered = [group[0], group[2], group[4], group[1], group[3], group[5]]
                 odds.extend(reordered)
+                group = local_lines[i:i+6]
+                lines.extend([group[0], group[2], group[4], group[1], group[3], group[5]])
             else:
                 odds.extend([''] * 6)
-    return teams, odds
+                lines.extend([''] * 6)
+    return games_from_slots([t.text for t in teams], odds, lines)
+
+
+# Problems the scrapers noticed on the last parse, e.g. a heuristic that looks off
+scrape_warnings = {}
+
+FANDUEL_MAX_EVENTS = 30  # more events than a full slate means the fallback grouped badly
+
+
+def fanduel_from_texts(texts):
+    # FanDuel fallback when there are no data-test event blocks. `texts` are the
+    # page's leaf <span> strings in document order; one pass groups them into
+    # events: the last two names before a run of prices are that event's teams.
+    events = []
+    names = []
+    current = None
+    for text in texts:
+        if '+' in text or '-' in text:
+            if current is None:
+                if len(names) < 2:
+                    continue  # a price with no teams in front of it
+                current = (names[-2:], [])
+                events.append(current)
+                names = []
+            current[1].append(text.strip())
+        else:
+            current = None
+            names.append(text)
+    teams = []
+    odds = []
+    for event_names, prices in events:
+        teams.extend(event_names)
+        odds.extend((prices + ['', ''])[:2])
+    check_fanduel_fallback(events, len(texts))
+    return games_from_moneylines(teams, odds)
+
+
+def check_fanduel_fallback(events, span_count):
+    # Flag groupings that are likely misaligned instead of publishing them silently
+    if not events and span_count:
+        warning = f'fallback found no events in {span_count} text spans'
+    elif len(events) > FANDUEL_MAX_EVENTS:
+        warning = f'fallback found {len(events)} events (max {FANDUEL_MAX_EVENTS})'
+    else:
+        extra = sum(1 for _, prices in events if len(prices) != 2)
+        warning = f'fallback found {extra} of {len(events)} events without exactly 2 prices' if extra else None
+    if warning:
+        scrape_warnings['fanduel'] = warning
 
 
 def scrape_fanduel(soup):
     # FanDuel MLB moneyline odds scraping (robust to dynamic classes)
+    scrape_warnings.pop('fanduel', None)
     teams = []
     odds = []
     # Find all event/game blocks (look for data-test attribute or role)
     event_blocks = soup.find_all(lambda tag: tag.name == 'div' and tag.has_attr('data-test') and 'event' in tag['data-test'])
     if not event_blocks:
-        # Fallback: try to find blocks with at least two team names and two odds
-        event_blocks = []
-        for div in soup.find_all('div'):
-            team_spans = div.find_all('span', string=True)
-            odds_spans = div.find_all('span', string=True)
-            if len(team_spans) >= 2 and any('+' in s or '-' in s for s in [el.text for el in odds_spans]):
-                event_blocks.append(div)
+        # Fallback: a single pass over the leaf text spans
+        return fanduel_from_texts([el.text for el in soup.find_all('span', string=True) if el.span is None])
     for block in event_blocks:
         # Team names: look for <span> with data-test or aria-label or just text
         team_spans = block.find_all('span', attrs={'data-test': 'participant-name'})
@@ -130,15 +389,135 @@ def scrape_fanduel(soup):
         # If odds are missing, pad with empty strings
         if len(odds_spans) < 2:
             odds.extend([''] * (2 - len(odds_spans)))
-    # Return stripped team names as objects with .text attribute for compatibility
-    class FakeTag:
-        def __init__(self, text):
-            self.text = text
-    teams = [FakeTag(t.text if hasattr(t, 'text') else t) for t in teams]
-    # Pad odds to match teams
-    if len(odds) < len(teams):
-        odds.extend([''] * (len(teams) - len(odds)))
-    return teams, odds
+    return games_from_moneylines([t.text for t in teams], odds)
+
+
+# lxml backend: the same extraction as the scrape_* functions above, but with
+# precompiled XPath run straight on the lxml tree instead of building a soup.
+# Each expression mirrors bs4's class_ matching: a single class name matches any
+# class token, a multi-word string must equal the whole class attribute.
+def _xpath_has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _xpath_class_is(*names):
+    return ' or '.join(f"normalize-space(@class)='{name}'" for name in names)
+
+DK_TEAMS_XPATH = etree.XPath(f"//div[{_xpath_has_class('event-cell__name-text')}]")
+DK_ODDS_XPATH = etree.XPath(
+    f"//*[self::span or self::div][{_xpath_has_class('sportsbook-odds')} or {_xpath_class_is('sportsbook-empty-cell body')}"
+    f" or {_xpath_has_class('sportsbook-outcome-cell__line')}]")
+BM_EVENTS_XPATH = etree.XPath(
+    f"//ms-six-pack-event[{_xpath_class_is('grid-event grid-six-pack-event ms-active-highlight two-lined-name ng-star-inserted')}]")
+BM_TEAMS_XPATH = etree.XPath(f".//div[{_xpath_has_class('participant')}]")
+BM_ODDS_XPATH = etree.XPath(
+    ".//*[self::span or self::div or self::ms-option-group][" + _xpath_class_is(
+        'custom-odds-value-style ng-star-inserted',
+        'offline option-indicator',
+        'grid-option-group grid-group offline suspended-lock-box two-column ng-star-inserted')
+    + f" or (self::div and {_xpath_has_class('name')})]")
+FD_EVENTS_XPATH = etree.XPath("//div[contains(@data-test, 'event')]")
+FD_TEAMS_XPATH = etree.XPath(".//span[@data-test='participant-name']")
+SPANS_XPATH = etree.XPath(".//span")
+SPAN_CHILD_XPATH = etree.XPath(".//span[1]")
+
+
+def _lxml_string(el):
+    # Equivalent of bs4's Tag.string: the text if el holds exactly one string,
+    # following single-child chains, else None
+    while True:
+        children = list(el)
+        if not children:
+            return el.text or None
+        if len(children) > 1 or el.text or children[0].tail:
+            return None
+        el = children[0]
+        if not isinstance(el.tag, str):  # comment
+            return el.text
+
+def _lxml_string_spans(el):
+    return [span for span in SPANS_XPATH(el) if _lxml_string(span) is not None]
+
+
+def scrape_draftkings_lxml(root):
+    teams = [strip_city(t.text_content()) for t in DK_TEAMS_XPATH(root)]
+    odds = []
+    lines = []
+    line = ''
+    for el in DK_ODDS_XPATH(root):
+        classes = el.get('class', '').split()
+        if 'sportsbook-outcome-cell__line' in classes:
+            line = el.text_content().strip()
+        elif 'sportsbook-empty-cell' in classes:
+            odds.append('')
+            lines.append('')
+            line = ''
+        elif 'sportsbook-odds' in classes:
+            text = el.text_content().strip()
+            if text and (text[0] == '+' or text[0] == '-' or text[0] == '−'):
+                odds.append(text.replace('−', '-'))
+                lines.append(line)
+            line = ''
+    return games_from_slots(teams, odds, lines)
+
+
+def scrape_betmgm_lxml(root):
+    teams = []
+    odds = []
+    lines = []
+    for block in BM_EVENTS_XPATH(root):
+        teams += [t.text_content() for t in BM_TEAMS_XPATH(block)]
+        local_odds = []
+        local_lines = []
+        line = ''
+        for el in BM_ODDS_XPATH(block):
+            classes = el.get('class', '').split()
+            if 'option-indicator' in classes and 'offline' in classes:
+                local_odds.append('')
+                local_lines.append('')
+                line = ''
+            elif 'grid-option-group' in classes and 'offline' in classes:
+                local_odds.append('')
+                local_odds.append('')
+                local_lines += ['', '']
+                line = ''
+            elif 'custom-odds-value-style' in classes:
+                text = el.text_content().strip()
+                if text and (text[0] == '+' or text[0] == '-'):
+                    local_odds.append(text)
+                    local_lines.append(line)
+                line = ''
+            elif el.tag == 'div' and 'name' in classes:
+                line = el.text_content().strip()
+        for i in range(0, len(local_odds), 6):
+            group = local_odds[i:i+6]
+            if len(group) == 6:
+                odds.extend([group[0], group[2], group[4], group[1], group[3], group[5]])
+                group = local_lines[i:i+6]
+                lines.extend([group[0], group[2], group[4], group[1], group[3], group[5]])
+            else:
+                odds.extend([''] * 6)
+                lines.extend([''] * 6)
+    return games_from_slots(teams, odds, lines)
+
+
+def scrape_fanduel_lxml(root):
+    scrape_warnings.pop('fanduel', None)
+    teams = []
+    odds = []
+    event_blocks = FD_EVENTS_XPATH(root)
+    if not event_blocks:
+        return fanduel_from_texts([el.text_content() for el in _lxml_string_spans(root) if not SPAN_CHILD_XPATH(el)])
+    for block in event_blocks:
+        spans = _lxml_string_spans(block)
+        team_spans = FD_TEAMS_XPATH(block)
+        if not team_spans:
+            team_spans = [el for el in spans if not any(c in el.text_content() for c in '+-')]
+        teams.extend(team_spans[:2])
+        odds_spans = [el for el in spans if any(c in el.text_content() for c in '+-')]
+        odds.extend([el.text_content().strip() for el in odds_spans[:2]])
+        if len(odds_spans) < 2:
+            odds.extend([''] * (2 - len(odds_spans)))
+    return games_from_moneylines([t.text_content() for t in teams], odds)
 
 
 SCRAPERS = {
@@ -147,68 +526,1427 @@ SCRAPERS = {
     'fanduel': scrape_fanduel,
 }
 
-URLS = {
-    'draftkings': 'https://sportsbook.draftkings.com/leagues/baseball/mlb',
-    'betmgm': 'https://www.az.betmgm.com/en/sports/baseball-23/betting/usa-9/mlb-75',
-    'fanduel': 'https://sportsbook.fanduel.com/navigation/mlb',  # MLB moneyline page
+LXML_SCRAPERS = {
+    'draftkings': scrape_draftkings_lxml,
+    'betmgm': scrape_betmgm_lxml,
+    'fanduel': scrape_fanduel_lxml,
+}
+
+# Parsing backend per book: 'lxml' (compiled XPath) or 'bs4' (BeautifulSoup)
+PARSE_BACKENDS = {
+    'draftkings': 'lxml',
+    'betmgm': 'lxml',
+    'fanduel': 'lxml',
+}
+
+def parse_page(site, html, backend=None):
+    backend = backend or PARSE_BACKENDS.get(site, 'bs4')
+    if backend == 'lxml':
+        return LXML_SCRAPERS[site](lxml.html.fromstring(html))
+    return SCRAPERS[site](BeautifulSoup(html, 'lxml'))
+
+# Parsing holds the GIL, stalling the request threads and the other scrapes
+# while it runs. With PARSE_PROCESSES > 0 page sources go to a pool of warm
+# worker processes instead and only the games (and any scrape warning) come back.
+PARSE_PROCESSES = 0  # 0 parses on the scrape thread
+parse_pool = None
+parse_pool_size = 0
+parse_pool_lock = threading.Lock()  # one scrape thread rebuilds a broken pool, the rest reuse it
+
+def warm_parser():
+    # Runs once in each worker: first parse pays for imports and lxml/bs4 setup
+    for site, html in (('draftkings', '<html></html>'), ('betmgm', '<html></html>')):
+        parse_page(site, html)
+
+def parse_in_worker(site, html):
+    games = parse_page(site, html)
+    return games, scrape_warnings.get(site)
+
+def start_parse_pool(processes=None):
+    # 'spawn' so workers never inherit the scraper's threads or Chrome sessions
+    global parse_pool, parse_pool_size
+    processes = PARSE_PROCESSES if processes is None else processes
+    if processes <= 0:
+        return None
+    parse_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=warm_parser)
+    # Submitting one job per worker at once spawns them all now, not on the first scrapes
+    for future in [parse_pool.submit(warm_parser) for _ in range(processes)]:
+        future.result()
+    parse_pool_size = processes
+    return parse_pool
+
+def stop_parse_pool():
+    global parse_pool, parse_pool_size
+    if parse_pool is not None:
+        parse_pool.shutdown(cancel_futures=True)
+        parse_pool = None
+        parse_pool_size = 0
+
+def rebuild_parse_pool(broken):
+    # A worker that dies (OOM kill, crash) breaks the whole pool for good, so
+    # replace it. Threads that hit the same broken pool find it already
+    # replaced. If no pool can be started, parsing stays on the scrape threads.
+    global parse_pool, parse_pool_size
+    with parse_pool_lock:
+        if parse_pool is broken:
+            processes = parse_pool_size
+            broken.shutdown(wait=False, cancel_futures=True)
+            parse_pool, parse_pool_size = None, 0
+            try:
+                start_parse_pool(processes)
+            except Exception:
+                if parse_pool is not None:
+                    parse_pool.shutdown(wait=False, cancel_futures=True)
+                parse_pool, parse_pool_size = None, 0
+        return parse_pool
+
+def parse_source(site, html):
+    # parse_page, in the process pool when there is one
+    pool = parse_pool
+    if pool is None:
+        return parse_page(site, html)
+    try:
+        games, warning = pool.submit(parse_in_worker, site, html).result()
+    except BrokenProcessPool:
+        # This page may be what killed the worker, so it is parsed here rather
+        # than offered to the new pool
+        rebuild_parse_pool(pool)
+        return parse_page(site, html)
+    if warning:
+        scrape_warnings[site] = warning
+    else:
+        scrape_warnings.pop(site, None)
+    return games
+
+# In-browser extraction: the scrapers' selectors run inside Chrome through
+# execute_script and only {teams, odds} comes back, instead of the whole DOM
+# via page_source. The layout matches what the scrape_* functions return.
+JS_HELPERS = r'''
+function classOf(el) { return (el.getAttribute('class') || '').trim().split(/\s+/).join(' '); }
+function classIs(el, name) { return classOf(el) === name; }
+function hasClass(el, name) { return classOf(el).split(' ').indexOf(name) !== -1; }
+function isPrice(text) { return text.length > 0 && (text[0] === '+' || text[0] === '-' || text[0] === '−'); }
+function stringOf(el) {
+    // Same as bs4's Tag.string: the text if el holds exactly one string, else null
+    while (true) {
+        if (el.childNodes.length !== 1) return null;
+        var kid = el.childNodes[0];
+        if (kid.nodeType === Node.TEXT_NODE || kid.nodeType === Node.COMMENT_NODE) return kid.nodeValue;
+        if (kid.nodeType !== Node.ELEMENT_NODE) return null;
+        el = kid;
+    }
+}
+function stringSpans(root) {
+    return Array.prototype.filter.call(root.querySelectorAll('span'), function (el) { return stringOf(el) !== null; });
+}
+'''
+
+JS_EXTRACTORS = {
+    'draftkings': JS_HELPERS + r'''
+var teams = [], odds = [], lines = [], line = '';
+document.querySelectorAll('div.event-cell__name-text').forEach(function (el) { teams.push(el.textContent); });
+document.querySelectorAll('span, div').forEach(function (el) {
+    if (hasClass(el, 'sportsbook-empty-cell') && (hasClass(el, 'sportsbook-odds') || classIs(el, 'sportsbook-empty-cell body'))) {
+        odds.push('');
+        lines.push('');
+        line = '';
+    } else if (hasClass(el, 'sportsbook-odds')) {
+        var text = el.textContent.trim();
+        if (isPrice(text)) {
+            odds.push(text.split('−').join('-'));
+            lines.push(line);
+        }
+        line = '';
+    } else if (hasClass(el, 'sportsbook-outcome-cell__line')) {
+        line = el.textContent.trim();
+    }
+});
+return {teams: teams, odds: odds, lines: lines};
+''',
+    'betmgm': JS_HELPERS + r'''
+var teams = [], odds = [], lines = [];
+document.querySelectorAll('ms-six-pack-event').forEach(function (block) {
+    if (!classIs(block, 'grid-event grid-six-pack-event ms-active-highlight two-lined-name ng-star-inserted')) return;
+    block.querySelectorAll('div.participant').forEach(function (el) { teams.push(el.textContent); });
+    var local = [], localLines = [], line = '';
+    block.querySelectorAll('span, div, ms-option-group').forEach(function (el) {
+        var cls = classOf(el);
+        if (cls === 'offline option-indicator') {
+            local.push('');
+            localLines.push('');
+            line = '';
+        } else if (cls === 'grid-option-group grid-group offline suspended-lock-box two-column ng-star-inserted') {
+            local.push('', '');
+            localLines.push('', '');
+            line = '';
+        } else if (cls === 'custom-odds-value-style ng-star-inserted') {
+            var text = el.textContent.trim();
+            if (text && (text[0] === '+' || text[0] === '-')) {
+                local.push(text);
+                localLines.push(line);
+            }
+            line = '';
+        } else if (el.tagName === 'DIV' && hasClass(el, 'name')) {
+            line = el.textContent.trim();
+        }
+    });
+    for (var i = 0; i < local.length; i += 6) {
+        var g = local.slice(i, i + 6), l = localLines.slice(i, i + 6);
+        if (g.length === 6) {
+            odds.push(g[0], g[2], g[4], g[1], g[3], g[5]);
+            lines.push(l[0], l[2], l[4], l[1], l[3], l[5]);
+        } else {
+            odds.push('', '', '', '', '', '');
+            lines.push('', '', '', '', '', '');
+        }
+    }
+});
+return {teams: teams, odds: odds, lines: lines};
+''',
+    'fanduel': JS_HELPERS + r'''
+var teams = [], odds = [];
+var hasSign = function (text) { return text.indexOf('+') !== -1 || text.indexOf('-') !== -1; };
+var blocks = document.querySelectorAll('div[data-test*="event"]');
+if (!blocks.length) {
+    // No event blocks: return the leaf text spans for fanduel_from_texts
+    return {fallback: stringSpans(document).filter(function (el) {
+        return !el.querySelectorAll('span').length;
+    }).map(function (el) { return el.textContent; })};
+}
+blocks.forEach(function (block) {
+    var spans = stringSpans(block);
+    var names = Array.prototype.slice.call(block.querySelectorAll('span[data-test="participant-name"]'));
+    if (!names.length) names = spans.filter(function (el) { return !hasSign(el.textContent); });
+    names.slice(0, 2).forEach(function (el) { teams.push(el.textContent); });
+    var prices = spans.filter(function (el) { return hasSign(el.textContent); });
+    prices.slice(0, 2).forEach(function (el) { odds.push(el.textContent.trim()); });
+    for (var i = prices.length; i < 2; i++) odds.push('');
+});
+while (odds.length < teams.length) odds.push('');
+return {teams: teams, odds: odds};
+''',
+}
+
+# Where each book's odds come from: 'page_source' (serialize the DOM and parse it
+# with PARSE_BACKENDS), 'browser' (run JS_EXTRACTORS inside Chrome) or 'network'
+# (decode the JSON feeds the page itself downloads; see FEED_DECODERS)
+EXTRACT_MODES = {
+    'draftkings': 'page_source',
+    'betmgm': 'page_source',
+    'fanduel': 'page_source',
+}
+
+def from_browser_extract(site, data):
+    if site == 'fanduel':
+        scrape_warnings.pop('fanduel', None)
+        if 'fallback' in data:
+            return fanduel_from_texts(data['fallback'])
+        return games_from_moneylines(data['teams'], data['odds'])
+    # 'lines' is missing from extractions recorded before lines were read
+    if site == 'draftkings':
+        return games_from_slots([strip_city(t) for t in data['teams']], data['odds'], data.get('lines', ()))
+    return games_from_slots(data['teams'], data['odds'], data.get('lines', ()))
+
+def extract_in_browser(driver, site):
+    return driver.execute_script(JS_EXTRACTORS[site])
+
+# Network capture. The books' front ends fill their odds grids from JSON: an
+# XHR/fetch response when the page loads, then WebSocket pushes. In 'network'
+# mode the driver logs Chrome's Network events (enable_network_capture), and a
+# scrape drains that log instead of touching the DOM: finished feed responses
+# have their bodies fetched over CDP, pushed frames arrive in the log itself.
+# Each message is decoded into a per-page feed state, so partial pushes update
+# the games an earlier response listed.
+#
+# The feed formats below follow what each front end downloads today; they break
+# when the JSON changes, as the scrapers do when the markup does.
+FEED_URLS = {
+    'draftkings': re.compile(r'/sportscontent/|dkpush'),
+    'betmgm': re.compile(r'/cds-api/bettingoffer/|cds-push'),
+    'fanduel': re.compile(r'/content-managed-page|/api/event-page'),
+}
+FEED_SIDES = {'Away': 0, 'Home': 1}  # DraftKings outcomeType -> side; the away team is listed first
+
+feed_states = {}  # page -> decoded feed, merged across responses and pushes
+feed_queue = {}  # page -> [('response', requestId) or ('frame', text)] not yet read, oldest first
+feed_loading = {}  # requestId -> page, for feed responses whose body hasn't finished loading
+feed_sockets = {}  # requestId -> page, for feed WebSockets
+
+def new_feed_state():
+    # events: id -> [team1, team2]; prices: id -> [moneyline1, moneyline2];
+    # markets: market id -> event id, for pushes that only name the market
+    return {'events': {}, 'prices': {}, 'markets': {}, 'revision': 0, 'messages': 0, 'skipped': 0}
+
+def set_feed_event(state, event_id, team1, team2):
+    teams = [team1.strip(), team2.strip()]
+    if state['events'].get(event_id) != teams:
+        state['events'][event_id] = teams
+        state['revision'] += 1
+
+def set_feed_price(state, event_id, side, price):
+    # price: int, '+150'/'−110' string, or None for a suspended selection
+    price = price if isinstance(price, int) else parse_american(price)
+    prices = state['prices'].setdefault(event_id, [MISSING, MISSING])
+    if prices[side] != price:
+        prices[side] = price
+        state['revision'] += 1
+
+def decode_draftkings_feed(payload, state):
+    # {'events': [...], 'markets': [...], 'selections': [...]}; pushes carry only some of the three
+    for event in payload.get('events', ()):
+        teams = {p.get('venueRole'): p.get('name') for p in event.get('participants', ())}
+        if teams.get('Away') and teams.get('Home'):
+            set_feed_event(state, event['id'], strip_city(teams['Away']), strip_city(teams['Home']))
+    for market in payload.get('markets', ()):
+        if market.get('marketType', {}).get('name') == 'Moneyline':
+            state['markets'][market['id']] = market['eventId']
+    for selection in payload.get('selections', ()):
+        event_id = state['markets'].get(selection.get('marketId'))
+        side = FEED_SIDES.get(selection.get('outcomeType'))
+        if event_id is not None and side is not None:
+            set_feed_price(state, event_id, side, selection.get('displayOdds', {}).get('american'))
+
+def decode_betmgm_feed(payload, state):
+    # {'fixtures': [...]} from the page's fetch, {'fixture': {...}} in a push
+    fixtures = payload.get('fixtures') or ([payload['fixture']] if 'fixture' in payload else [])
+    for fixture in fixtures:
+        names = [p.get('name', {}).get('value') for p in fixture.get('participants', ())]
+        if len(names) == 2 and all(names):
+            set_feed_event(state, fixture['id'], *names)
+        for market in fixture.get('games', []) + fixture.get('optionMarkets', []):
+            if market.get('name', {}).get('value') != 'Money Line':
+                continue
+            results = market.get('results') or market.get('options') or []
+            for side, result in enumerate(results[:2]):
+                odds = result.get('americanOdds', result.get('price', {}).get('americanOdds'))
+                set_feed_price(state, fixture['id'], side, odds)
+
+def decode_fanduel_feed(payload, state):
+    # {'attachments': {'markets': {id: market}}}; runners are listed away team first
+    attachments = payload.get('attachments', payload)
+    for market in attachments.get('markets', {}).values():
+        if market.get('marketType') != 'MONEY_LINE':
+            continue
+        runners = market.get('runners', [])[:2]
+        if len(runners) == 2 and all(r.get('runnerName') for r in runners):
+            set_feed_event(state, market['eventId'], runners[0]['runnerName'], runners[1]['runnerName'])
+        for side, runner in enumerate(runners):
+            odds = runner.get('winRunnerOdds', {}).get('americanDisplayOdds', {}).get('americanOdds')
+            set_feed_price(state, market['eventId'], side, odds)
+
+FEED_DECODERS = {
+    'draftkings': decode_draftkings_feed,
+    'betmgm': decode_betmgm_feed,
+    'fanduel': decode_fanduel_feed,
+}
+
+def feed_messages(text):
+    # JSON objects in a response body or frame; SignalR-style sockets put
+    # several in one frame separated by \x1e
+    for part in text.split('\x1e'):
+        try:
+            message = json.loads(part)
+        except ValueError:
+            continue
+        if isinstance(message, dict):
+            yield message
+
+def tab_pages(browser):
+    # Chrome target id (the performance log's 'webview') -> page
+    return {handle.removeprefix('CDwindow-'): page for page, (b, handle) in page_tabs.items() if b == browser}
+
+def capture_network(driver, browser):
+    # Drain the browser's performance log into feed_queue. Runs under the browser
+    # lock; entries for the browser's other tabs are queued for their next read.
+    tabs = tab_pages(browser)
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])
+        method, params = message['message']['method'], message['message']['params']
+        request_id = params.get('requestId')
+        if method == 'Network.loadingFinished' and request_id in feed_loading:
+            feed_queue.setdefault(feed_loading.pop(request_id), []).append(('response', request_id))
+        elif method == 'Network.loadingFailed':
+            feed_loading.pop(request_id, None)
+        elif method == 'Network.webSocketFrameReceived' and request_id in feed_sockets:
+            if params['response'].get('opcode') == 1:  # text frames only
+                feed_queue.setdefault(feed_sockets[request_id], []).append(('frame', params['response']['payloadData']))
+        elif method == 'Network.webSocketClosed':
+            feed_sockets.pop(request_id, None)
+        elif method in ('Network.responseReceived', 'Network.webSocketCreated'):
+            page = tabs.get(message.get('webview'))
+            if page is None or EXTRACT_MODES.get(book_of(page)) != 'network':
+                continue
+            url = params['response']['url'] if method == 'Network.responseReceived' else params['url']
+            if FEED_URLS[book_of(page)].search(url):
+                (feed_loading if method == 'Network.responseReceived' else feed_sockets)[request_id] = page
+
+def read_feed(driver, page):
+    # Feed payloads (text) that arrived for the page since its last read, oldest
+    # first. The page's tab must be in front: bodies are fetched from its target.
+    capture_network(driver, page_tabs[page][0])
+    payloads = []
+    for kind, value in feed_queue.pop(page, []):
+        if kind == 'frame':
+            payloads.append(value)
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': value})
+        except Exception:
+            continue  # evicted from Chrome's buffer, or from before a reload
+        payloads.append(base64.b64decode(body['body']).decode() if body.get('base64Encoded') else body['body'])
+    return payloads
+
+def decode_feed(page, payloads):
+    state = feed_states.setdefault(page, new_feed_state())
+    decoder = FEED_DECODERS[book_of(page)]
+    for text in payloads:
+        for message in feed_messages(text):
+            state['messages'] += 1
+            try:
+                decoder(message, state)
+            except (KeyError, TypeError, AttributeError, ValueError):
+                state['skipped'] += 1  # not an odds message, or a format we don't know
+    return state
+
+def feed_games(state):
+    # Games with a moneyline market, in the order the feed first listed them
+    games = []
+    for event_id, (team1, team2) in state['events'].items():
+        if event_id not in state['prices']:
+            continue
+        prices = [MISSING] * 6
+        for side, slot in enumerate(MONEYLINE_SLOTS):
+            prices[slot] = state['prices'][event_id][side]
+        games.append(Game(team1, team2, prices))
+    return games
+
+def reset_feed(page):
+    # After a reload the page fetches its feed again; start from that. The
+    # revision restarts too, so it must not match the old fingerprint.
+    feed_states.pop(page, None)
+    feed_queue.pop(page, None)
+    page_fingerprints.pop(page, None)
+    pending_fingerprints.pop(page, None)
+    for requests in (feed_loading, feed_sockets):
+        for request_id in [r for r, p in requests.items() if p == page]:
+            requests.pop(request_id, None)
+
+# league -> book -> moneyline page. Each book uses the same page layout for
+# every league, so one scraper per book covers them all.
+LEAGUES = {
+    'mlb': {
+        'draftkings': 'https://sportsbook.draftkings.com/leagues/baseball/mlb',
+        'betmgm': 'https://www.az.betmgm.com/en/sports/baseball-23/betting/usa-9/mlb-75',
+        'fanduel': 'https://sportsbook.fanduel.com/navigation/mlb',  # MLB moneyline page
+    },
+    'nba': {
+        'draftkings': 'https://sportsbook.draftkings.com/leagues/basketball/nba',
+        'betmgm': 'https://www.az.betmgm.com/en/sports/basketball-7/betting/usa-9/nba-6004',
+        'fanduel': 'https://sportsbook.fanduel.com/navigation/nba',
+    },
+    'nfl': {
+        'draftkings': 'https://sportsbook.draftkings.com/leagues/football/nfl',
+        'betmgm': 'https://www.az.betmgm.com/en/sports/football-11/betting/usa-9/nfl-35',
+        'fanduel': 'https://sportsbook.fanduel.com/navigation/nfl',
+    },
+    'nhl': {
+        'draftkings': 'https://sportsbook.draftkings.com/leagues/hockey/nhl',
+        'betmgm': 'https://www.az.betmgm.com/en/sports/ice-hockey-12/betting/usa-9/nhl-34',
+        'fanduel': 'https://sportsbook.fanduel.com/navigation/nhl',
+    },
 }
+ACTIVE_LEAGUES = ['mlb']
+URLS = LEAGUES['mlb']  # single-page helpers (get_soup, browser_bench) use MLB
+
+# A page is one book's page for one league, keyed 'book:league'
+def page_key(book, league):
+    return f'{book}:{league}'
+
+def book_of(page):
+    return page.split(':', 1)[0]
+
+def league_of(page):
+    return page.split(':', 1)[1]
+
+def page_url(page):
+    return LEAGUES[league_of(page)][book_of(page)]
+
+def active_pages():
+    return {page_key(book, league): url for league in ACTIVE_LEAGUES for book, url in LEAGUES[league].items()}
 
 
 # Shared data for latest odds
-def get_moneyline_table(teams, odds):
-    num_games = len(teams) // 2
+def get_moneyline_table(games):
     lines = []
-    for i in range(num_games):
-        t1 = teams[i*2].text.strip()
-        t2 = teams[i*2+1].text.strip()
-        o1 = odds[i*6+2] if i*6+2 < len(odds) else ''
-        o2 = odds[i*6+5] if i*6+5 < len(odds) else ''
-        lines.append(f"{t1:20} {o1:>8}")
-        lines.append(f"{t2:20} {o2:>8}")
+    for game in games:
+        lines.append(f"{game.team1:20} {game.text(2):>8}")
+        lines.append(f"{game.team2:20} {game.text(5):>8}")
         lines.append("")
     return '\n'.join(lines)
 
 latest_tables = {'dk': '', 'bm': ''}
-selenium_drivers = {}
+selenium_drivers = {}  # browser -> WebDriver session (see the browser pool below)
 
-def start_persistent_drivers():
-    chrome_options = Options()
-    # chrome_options.add_argument('--headless')  # For debugging, keep visible
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--no-sandbox')
-    selenium_drivers['draftkings'] = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    selenium_drivers['betmgm'] = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    selenium_drivers['fanduel'] = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    selenium_drivers['draftkings'].get(URLS['draftkings'])
-    selenium_drivers['betmgm'].get(URLS['betmgm'])
-    selenium_drivers['fanduel'].get(URLS['fanduel'])
-    time.sleep(5)  # Let JS load
-
-def get_soup_persistent(site):
-    driver = selenium_drivers[site]
-    html = driver.page_source
-    return BeautifulSoup(html, 'lxml')
+# Immutable, versioned view of the aligned games. Only the scraper thread builds
+# snapshots; HTTP handlers just read whichever one is current.
+Snapshot = namedtuple('Snapshot', ['version', 'published_at', 'games', 'arbs'], defaults=((),))
+latest_snapshot = Snapshot(0, 0.0, ())
+snapshot_lock = threading.Lock()
 
-def close_persistent_drivers():
-    for drv in selenium_drivers.values():
+# Streaming clients. Each subscriber owns a bounded queue of (version, event
+# text); publish_snapshot serializes every event once and fans it out.
+# Events that aren't snapshots (publish_observed) carry version None.
+snapshot_subscribers = set()
+SUBSCRIBER_BACKLOG = 32  # events a slow client may fall behind before it is resynced
+STREAM_KEEPALIVE = 15  # seconds between SSE keepalive comments
+
+def game_key(game):
+    return game['key']  # see game_keys
+
+def snapshot_delta(old, new):
+    # Games whose block changed or appeared, keys that disappeared, and the new
+    # order when the set of games changed
+    previous = {game_key(g): g for g in old.games}
+    current = [game_key(g) for g in new.games]
+    changed = [g for key, g in zip(current, new.games) if previous.get(key) != g]
+    present = set(current)
+    removed = [key for key in previous if key not in present]
+    delta = {'version': new.version, 'published_at': new.published_at, 'games': changed, 'removed': removed}
+    if current != list(previous):
+        delta['order'] = current
+    if old.arbs != new.arbs:
+        delta['arbs'] = list(new.arbs)
+    return delta
+
+def publish_observed():
+    # Tells stream clients when each page was last read, so the dashboard can
+    # age every quote between snapshots. Dropped for clients that are behind.
+    with snapshot_lock:
+        if not snapshot_subscribers:
+            return
+        message = (None, sse_event('observed', {'observed': observed_times()}))
+        for q in snapshot_subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+def snapshot_event(snap):
+    return sse_event('full', {'version': snap.version, 'published_at': snap.published_at,
+                              'games': list(snap.games), 'arbs': list(snap.arbs)})
+
+# Recent snapshots, so /odds_json?since=<version> can answer with a delta, and
+# their encoded bodies, so each version is serialized and compressed only once
+SNAPSHOT_HISTORY = 64
+snapshot_history = deque(maxlen=SNAPSHOT_HISTORY)
+encoded_bodies = {}
+encoded_lock = threading.Lock()
+
+def publish_snapshot(games, arbs=()):
+    global latest_snapshot
+    with snapshot_lock:
+        previous = latest_snapshot
+        latest_snapshot = Snapshot(previous.version + 1, time.time(), tuple(games), tuple(arbs))
+        snapshot_history.append(latest_snapshot)
+        with encoded_lock:
+            encoded_bodies.clear()
+        if snapshot_subscribers:
+            message = (latest_snapshot.version, sse_event('delta', snapshot_delta(previous, latest_snapshot)))
+            for q in snapshot_subscribers:
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    # Too far behind for deltas to add up; send it the full state instead
+                    drain(q)
+                    q.put_nowait(None)
+    return latest_snapshot
+
+def drain(q):
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+
+def get_snapshot():
+    # Swapping the global is atomic, so readers never need the lock
+    return latest_snapshot
+
+def snapshot_at(version):
+    for snap in snapshot_history:
+        if snap.version == version:
+            return snap
+    return None
+
+def odds_payload(snap, since=None):
+    # Full state, or only what changed after `since` while that version is still in history
+    base = snapshot_at(since) if since is not None else None
+    if base is None:
+        return {'version': snap.version, 'published_at': snap.published_at, 'games': list(snap.games)}
+    return dict(snapshot_delta(base, snap), since=since)
+
+def encoded_odds(snap, since=None, gzipped=False):
+    # JSON body for (version, since, encoding), built once and shared by every request
+    key = (snap.version, since, gzipped)
+    body = encoded_bodies.get(key)  # cache hits skip the lock
+    if body is not None:
+        return body
+    with encoded_lock:
+        body = encoded_bodies.get(key)
+        if body is None:
+            body = json.dumps(odds_payload(snap, since)).encode()
+            if gzipped:
+                body = gzip.compress(body, compresslevel=6)
+            encoded_bodies[key] = body
+    return body
+
+def stream_snapshots():
+    # SSE generator: the full state first, then one delta per published snapshot
+    q = queue.Queue(SUBSCRIBER_BACKLOG)
+    with snapshot_lock:
+        snapshot_subscribers.add(q)
+        snap = latest_snapshot
+    try:
+        yield snapshot_event(snap)
+        yield sse_event('observed', {'observed': observed_times()})
+        sent = snap.version
+        while True:
+            try:
+                message = q.get(timeout=STREAM_KEEPALIVE)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if message is None:
+                snap = get_snapshot()
+                yield snapshot_event(snap)
+                sent = snap.version
+            elif message[0] is None:
+                yield message[1]  # not tied to a snapshot version
+            elif message[0] > sent:
+                yield message[1]
+                sent = message[0]
+    finally:
+        with snapshot_lock:
+            snapshot_subscribers.discard(q)
+
+# Browser pool. Pages (one per book and league) are spread over
+# BROWSER_INSTANCES Chrome sessions, one tab each, instead of one Chrome per
+# page. A WebDriver session answers one command at a time, so every read of a
+# tab holds its browser's lock just long enough to switch to the tab and pull
+# the fingerprint/source; parsing happens after the lock is released.
+#
+# Supervision. Chrome sessions leak memory over a day of SPA updates and
+# occasionally hang or crash; the scrape thread checks every browser and page
+# each cycle and restarts a browser, reopens a tab or reloads a page on a pool
+# worker, so everything else keeps scraping (and the last good games keep
+# being served) meanwhile.
+BROWSER_INSTANCES = 2
+MAX_CONSECUTIVE_ERRORS = 3  # failed/timed-out scrapes in a row before a tab is reopened
+HUNG_AFTER = 30  # seconds a scrape, or one step of a (re)start, may run before its Chrome is killed (3x SCRAPE_TIMEOUT)
+MAX_DRIVER_RSS_MB = 1500  # recycle once chromedriver + Chrome use more than this
+MAX_DRIVER_AGE = 6 * 3600  # recycle sessions older than this regardless
+MAX_STALE = 300  # reload a page whose odds haven't changed for this long
+MEMORY_CHECK_INTERVAL = 30  # seconds between /proc memory reads per browser
+RESTART_BACKOFF = 5  # seconds, doubled after every failed restart
+
+browser_locks = {}  # browser -> lock held while a command is in flight
+browser_pages = {}  # browser -> pages whose tabs it hosts
+page_tabs = {}  # page -> (browser, window handle)
+driver_health = {}  # browser -> supervisor state and counters, shown in /stats
+page_health = {}  # page -> the same for a single tab
+starting_browsers = {}  # browser -> [driver, monotonic start of its current step] while start_browser runs
+
+def process_tree(root_pid):
+    # root_pid and all of its descendants, from /proc (Linux only; [] elsewhere)
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
         try:
-            drv.quit()
-        except Exception:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+def tree_usage(root_pid):
+    # (CPU seconds, RSS MiB) summed over the process tree
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu, rss = 0.0, 0
+    for pid in process_tree(root_pid):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss / 1024
+
+def assign_pages(pages, instances=BROWSER_INSTANCES):
+    # Round-robin, so each browser gets a mix of books rather than all of one
+    instances = max(1, min(instances, len(pages)))
+    return {f'chrome-{i}': pages[i::instances] for i in range(instances)}
+
+def init_health(browser):
+    return driver_health.setdefault(browser, {
+        'restarts': 0, 'recycles': 0, 'failed_restarts': 0, 'last_reason': None,
+        'error': None, 'next_restart_at': 0, 'startup': None, 'pages': browser_pages.get(browser, []),
+    })
+
+def init_page_health(page):
+    return page_health.setdefault(page, {
+        'reopens': 0, 'refreshes': 0, 'consecutive_errors': 0, 'ready': None,
+        'last_ok': None, 'last_change': time.time(), 'submitted': None, 'killed': None,
+    })
+
+def open_tab(driver, page, new_tab):
+    # Loads the page in the current tab or a new one; returns the tab's window handle
+    if new_tab:
+        driver.switch_to.new_window('tab')
+    driver.get(page_url(page))
+    return driver.current_window_handle
+
+def start_browser(browser):
+    # New Chrome with one tab per assigned page. Tabs load one after another (a
+    # session runs one command at a time); browsers start in parallel.
+    health = init_health(browser)
+    start = time.perf_counter()
+    driver = new_driver(network_capture=any(
+        EXTRACT_MODES.get(book_of(page)) == 'network' for page in browser_pages[browser]))
+    # Not in selenium_drivers until every tab is up, so supervise_drivers
+    # watches each step here for hangs
+    step = starting_browsers[browser] = [driver, time.monotonic()]
+    try:
+        handles = {}
+        for i, page in enumerate(browser_pages[browser]):
+            step[1] = time.monotonic()
+            handles[page] = open_tab(driver, page, new_tab=i > 0)
+        for page, handle in handles.items():
+            step[1] = time.monotonic()
+            driver.switch_to.window(handle)
+            init_page_health(page)['ready'] = wait_for_odds(driver, book_of(page))
+    except Exception:
+        kill_driver(driver)
+        raise
+    finally:
+        starting_browsers.pop(browser, None)
+    now = time.time()
+    for page, handle in handles.items():
+        page_tabs[page] = (browser, handle)
+        page_health[page].update({'consecutive_errors': 0, 'last_ok': now, 'last_change': now, 'killed': None})
+    browser_locks.setdefault(browser, threading.Lock())
+    selenium_drivers[browser] = driver
+    health.update({
+        'started_at': now, 'rss_mb': None, 'memory_checked': 0, 'next_restart_at': 0, 'error': None,
+        'startup': round(time.perf_counter() - start, 3),
+    })
+    return driver
+
+def stop_browser(browser):
+    driver = selenium_drivers.pop(browser, None)
+    for page in browser_pages.get(browser, []):
+        page_tabs.pop(page, None)
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except Exception:
+        kill_driver(driver)
+
+def kill_driver(driver):
+    # Last resort for a hung session: kill chromedriver and every Chrome under it,
+    # which also makes any call blocked on it raise
+    process = getattr(driver.service, 'process', None)
+    if process is None:
+        return
+    for pid in reversed(process_tree(process.pid)):
+        try:
+            os.kill(pid, 9)
+        except OSError:
             pass
 
+def read_tab(page, fn):
+    # Run fn(driver) with the page's tab in front, holding its browser's lock
+    browser, handle = page_tabs[page]
+    driver = selenium_drivers[browser]
+    with browser_locks[browser]:
+        if driver.current_window_handle != handle:
+            driver.switch_to.window(handle)
+        return fn(driver)
+
+def restart_browser(browser, reason, recycle=False):
+    # Runs on a pool worker in place of the browser's page scrapes
+    health = driver_health[browser]
+    stop_browser(browser)
+    for page in browser_pages[browser]:
+        page_fingerprints.pop(page, None)
+        reset_feed(page)
+    try:
+        start_browser(browser)
+    except Exception as e:
+        health['failed_restarts'] += 1
+        driver_restarts.inc(browser=browser, kind='failed')
+        health['error'] = f'restart failed: {e}'
+        health['next_restart_at'] = time.time() + RESTART_BACKOFF * 2 ** min(health['failed_restarts'], 6)
+        return
+    health['recycles' if recycle else 'restarts'] += 1
+    driver_restarts.inc(browser=browser, kind='recycle' if recycle else 'restart')
+    health['failed_restarts'] = 0
+    health['last_reason'] = reason
+
+def reopen_tab(page):
+    # Replace one misbehaving tab without disturbing the others in its browser
+    browser, handle = page_tabs[page]
+    driver = selenium_drivers[browser]
+    with browser_locks[browser]:
+        try:
+            driver.switch_to.window(handle)
+            driver.close()
+        except Exception:
+            pass  # the tab may already be gone
+        driver.switch_to.window(driver.window_handles[0])
+        new_handle = open_tab(driver, page, new_tab=True)
+        page_health[page]['ready'] = wait_for_odds(driver, book_of(page))
+    page_tabs[page] = (browser, new_handle)
+    page_fingerprints.pop(page, None)
+    reset_feed(page)
+    health = page_health[page]
+    health['reopens'] += 1
+    tab_fixes.inc(page=page, kind='reopen')
+    health['consecutive_errors'] = 0
+    health['last_change'] = time.time()
+
+def refresh_tab(page):
+    page_health[page]['refreshes'] += 1
+    tab_fixes.inc(page=page, kind='refresh')
+    page_health[page]['last_change'] = time.time()
+    reset_feed(page)
+    read_tab(page, lambda driver: driver.refresh())
+
+def browser_action(browser):
+    # (action, reason) for a browser that needs attention, else None
+    health = driver_health[browser]
+    now = time.time()
+    if browser not in selenium_drivers:
+        return ('restart', health['error'] or 'not running') if now >= health['next_restart_at'] else None
+    pages = browser_pages[browser]
+    killed = [page_health[page]['killed'] for page in pages if page_health[page]['killed']]
+    if killed:
+        return 'restart', killed[0]
+    if pages and all(page_health[page]['consecutive_errors'] >= MAX_CONSECUTIVE_ERRORS for page in pages):
+        return 'restart', 'every tab failing'
+    if now - health['memory_checked'] >= MEMORY_CHECK_INTERVAL:
+        health['memory_checked'] = now
+        process = getattr(selenium_drivers[browser].service, 'process', None)
+        if process is not None:
+            health['rss_mb'] = round(tree_usage(process.pid)[1])
+    if health['rss_mb'] and health['rss_mb'] > MAX_DRIVER_RSS_MB:
+        return 'recycle', f"using {health['rss_mb']} MiB"
+    if now - health['started_at'] > MAX_DRIVER_AGE:
+        return 'recycle', 'age'
+    return None
+
+def page_action(page):
+    health = page_health[page]
+    if health['consecutive_errors'] >= MAX_CONSECUTIVE_ERRORS:
+        return reopen_tab
+    if time.time() - health['last_change'] > MAX_STALE:
+        return refresh_tab
+    return None
+
+def copy_table(table):
+    # {key: dict} table written by the scrape threads, copied for a request
+    # thread to serialize. dict.copy() never lets another thread in midway.
+    return {key: dict(value) for key, value in table.copy().items()}
+
+def pending(page):
+    future = scrape_futures.get(page)
+    return future is not None and not future.done()
+
+def supervise_drivers(pool):
+    # Called by the scrape thread before each cycle
+    for browser, pages in browser_pages.items():
+        step = starting_browsers.get(browser)
+        if step is not None and time.monotonic() - step[1] > HUNG_AFTER:
+            # A (re)start stuck loading a tab: killing it fails the restart,
+            # which is retried after RESTART_BACKOFF
+            starting_browsers.pop(browser, None)
+            kill_driver(step[0])
+        for page in pages:
+            health = page_health[page]
+            if (pending(page) and health['submitted'] and time.monotonic() - health['submitted'] > HUNG_AFTER
+                    and browser in selenium_drivers and not health['killed']):
+                health['killed'] = f'{page} hung for {HUNG_AFTER}s'  # restarted once the call unblocks
+                kill_driver(selenium_drivers[browser])
+        if any(pending(page) for page in pages):
+            continue
+        action = browser_action(browser)
+        if action is not None:
+            kind, reason = action
+            future = pool.submit(restart_browser, browser, reason, kind == 'recycle')
+            for page in pages:
+                scrape_futures[page] = future
+                page_health[page]['submitted'] = time.monotonic()
+            continue
+        if browser not in selenium_drivers:
+            continue
+        for page in pages:
+            fix = page_action(page)
+            if fix is not None:
+                scrape_futures[page] = pool.submit(fix, page)
+                page_health[page]['submitted'] = time.monotonic()
+
+def start_persistent_drivers(pages=None):
+    # Every browser launches and loads its tabs together; each tab is ready as
+    # soon as its odds render. A browser that fails to start is left to
+    # supervise_drivers to retry.
+    start = time.perf_counter()
+    pages = list(active_pages()) if pages is None else pages
+    browser_pages.clear()
+    if not pages:
+        return  # no active leagues: nothing to launch
+    browser_pages.update(assign_pages(pages))
+    for page in pages:
+        init_page_health(page)
+    chromedriver_path()  # resolve once up front rather than racing in every thread
+    with ThreadPoolExecutor(max_workers=len(browser_pages), thread_name_prefix='start') as pool:
+        futures = {browser: pool.submit(start_browser, browser) for browser in browser_pages}
+        for browser, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                init_health(browser)['error'] = f'start failed: {e}'
+    cycle_timings['startup'] = round(time.perf_counter() - start, 3)
+
+def get_soup_persistent(page):
+    return BeautifulSoup(read_tab(page, lambda driver: driver.page_source), 'lxml')
+
+def close_persistent_drivers():
+    for browser in list(selenium_drivers):
+        stop_browser(browser)
+
+SCRAPE_INTERVAL = 3  # starting interval per book; the scheduler adapts it from there
+SCRAPE_TIMEOUT = 10  # max seconds one book may take before the cycle moves on without it
+
+book_results = {}  # page -> [Game] from the last successful scrape
+book_timings = {}  # page -> timings/error of the last scrape attempt
+scrape_futures = {}  # page -> last submitted scrape/fix, so a hung tab never gets a second call
+cycle_timings = {'last': 0.0, 'cycles': 0, 'skipped': 0, 'startup': None, 'first_snapshot': None}
+process_started = time.perf_counter()
+
+# Prometheus metrics, served at /metrics. Scrape-path values are recorded as
+# they happen; the rest are read from existing state when /metrics is scraped.
+metrics_registry = Registry()
+scrape_fetch_seconds = metrics_registry.histogram(
+    'arb_scrape_fetch_seconds', 'Time a scrape held the browser (fingerprint and page read)', ['page'])
+scrape_parse_seconds = metrics_registry.histogram(
+    'arb_scrape_parse_seconds', 'Time turning a changed page read into games', ['page', 'mode'])
+scrape_payload_bytes = metrics_registry.histogram(
+    'arb_scrape_payload_bytes', 'Size of each changed page read', ['page'], buckets=BYTES_BUCKETS)
+scrapes = metrics_registry.counter(
+    'arb_scrapes_total', 'Scrape attempts by result: changed, unchanged, error, timeout or skipped', ['page', 'result'])
+align_seconds = metrics_registry.histogram(
+    'arb_align_seconds', 'Alignment, evaluation and block building per league rebuild', ['league'])
+cycle_seconds = metrics_registry.histogram('arb_cycle_seconds', 'Scheduler cycles that scraped at least one page')
+http_request_seconds = metrics_registry.histogram(
+    'arb_http_request_seconds', 'Time to produce a response (headers, for /stream)', ['endpoint', 'status'])
+driver_restarts = metrics_registry.counter(
+    'arb_driver_restarts_total', 'Browser restarts, recycles and failed restarts', ['browser', 'kind'])
+tab_fixes = metrics_registry.counter('arb_tab_fixes_total', 'Tabs reopened or reloaded', ['page', 'kind'])
+metrics_registry.gauge('arb_games', 'Reference-book games in the last build', ['league'],
+                       fn=lambda: {(league,): len(games) for league, (games, _) in league_games.items()})
+metrics_registry.gauge('arb_unmatched_games', 'Games one book lists that did not align with the reference book',
+                       ['league', 'book', 'kind'],
+                       fn=lambda: {(league, book, kind): len(report[kind])
+                                   for league, books in unmatched_games.items()
+                                   for book, report in books.items() for kind in ('missing', 'unused')})
+metrics_registry.gauge('arb_open_arbs', 'Arbs in the current snapshot, all markets', fn=lambda: len(latest_snapshot.arbs))
+metrics_registry.gauge('arb_open_middles', 'Spread and total middles in the current snapshot', fn=lambda: sum(
+    'middle' in summary for game in latest_snapshot.games for summary in game.get('markets', {}).values()))
+metrics_registry.gauge('arb_snapshot_version', 'Version of the current snapshot', fn=lambda: latest_snapshot.version)
+metrics_registry.gauge('arb_snapshot_age_seconds', 'Time since the current snapshot was published',
+                       fn=lambda: time.time() - latest_snapshot.published_at if latest_snapshot.version else math.nan)
+metrics_registry.gauge('arb_page_last_ok_age_seconds', 'Time since the page was last scraped successfully',
+                       ['page'], fn=lambda: {(page,): time.time() - health['last_ok']
+                                            for page, health in page_health.items() if health['last_ok']})
+metrics_registry.gauge('arb_stream_clients', 'Connected /stream clients', fn=lambda: len(snapshot_subscribers))
+stage_seconds = metrics_registry.histogram(
+    'arb_stage_seconds', 'Latency per stage between a page read and a browser displaying it (see /trace)', ['stage'])
+
+# Quote timestamps. Every successful read of a page observes all of its quotes
+# (page_observed); each quote also remembers when its price last moved
+# (Game.changed), carried from one read of the page to the next.
+page_observed = {}  # page -> wall time of its last successful read
+page_observed_lock = threading.Lock()  # the scrape thread writes it while request threads serialize it
+MAX_QUOTE_SKEW = 3.0  # seconds between the reads behind an arb's legs before the arb is flagged stale
+STALE_AFTER = 10  # seconds since a page was read before the dashboard greys its quotes
+
+def observed_times():
+    # Copy of page_observed that a request thread can serialize
+    with page_observed_lock:
+        return dict(page_observed)
+
+def stamp_quotes(games, previous, at):
+    # Sets game.changed per slot: kept from the page's previous games where the
+    # price and line are the same, `at` where either moved or the game is new. The n-th game
+    # of a matchup pairs with the n-th, as in align_books.
+    index = {}
+    for game in previous or ():
+        index.setdefault((game.team1, game.team2), []).append(game)
+    seen = {}
+    for game in games:
+        key = (game.team1, game.team2)
+        n = seen[key] = seen.get(key, -1) + 1
+        candidates = index.get(key, ())
+        old = candidates[n] if n < len(candidates) else None
+        if old is None or old.changed is None:
+            game.changed = [at] * 6
+        else:
+            game.changed = [was if price == before and same_line(line, before_line) else at
+                            for price, before, line, before_line, was
+                            in zip(game.prices, old.prices, game.lines, old.lines, old.changed)]
+
+# Latency tracing. Each published snapshot keeps a trace of how long its
+# changed pages took at every stage: poll_gap (time since the previous read, an
+# upper bound on how long the change sat on the site unseen), read, parse,
+# wait (for the cycle's other pages), align and publish. Dashboards report
+# deliver (published -> received) and render back through /display; those two
+# compare browser and server clocks, so they only mean something when the
+# clocks agree.
+TRACE_HISTORY = 256
+TRACE_STAGES = ('poll_gap', 'read', 'parse', 'wait', 'align', 'publish', 'deliver', 'render', 'end_to_end')
+MAX_DISPLAY_REPORTS = 20  # browser reports kept per trace
+traces = deque(maxlen=TRACE_HISTORY)
+
+def trace_snapshot(snap, pages, aligned):
+    # pages: the changed pages behind snap; aligned: league -> (start, end) wall times of its build
+    spans = {}
+    for page in pages:
+        timing = book_timings.get(page, {})
+        if timing.get('error') or 'observed_at' not in timing or league_of(page) not in aligned:
+            continue
+        spans[page] = {
+            'observed_at': timing['observed_at'], 'poll_gap': timing['poll_gap'], 'read': timing['fetch'],
+            'parse': timing['parse'], 'wait': max(0.0, aligned[league_of(page)][0] - timing['parsed_at']),
+        }
+    trace = {
+        'version': snap.version, 'published_at': snap.published_at, 'pages': spans,
+        'align': {league: end - start for league, (start, end) in aligned.items()},
+        'publish': snap.published_at - max(end for _, end in aligned.values()), 'displays': [],
+    }
+    for span in spans.values():
+        for stage in ('poll_gap', 'read', 'parse', 'wait'):
+            if span[stage] is not None:
+                stage_seconds.observe(span[stage], stage=stage)
+    for seconds in trace['align'].values():
+        stage_seconds.observe(seconds, stage='align')
+    stage_seconds.observe(trace['publish'], stage='publish')
+    traces.append(trace)
+
+def record_display(version, received, rendered):
+    # A dashboard's report that it received and rendered snapshot `version`
+    trace = next((t for t in reversed(traces) if t['version'] == version), None)
+    if trace is None:
+        return False
+    display = {'deliver': received - trace['published_at'], 'render': rendered - received}
+    if trace['pages']:
+        display['end_to_end'] = rendered - min(span['observed_at'] for span in trace['pages'].values())
+    if len(trace['displays']) < MAX_DISPLAY_REPORTS:
+        trace['displays'].append(display)
+    for stage, seconds in display.items():
+        if seconds >= 0:
+            stage_seconds.observe(seconds, stage=stage)
+    return True
+
+def trace_breakdown():
+    # p50/p90/max per stage over the traces still in history
+    values = {stage: [] for stage in TRACE_STAGES}
+    for trace in traces:
+        for span in trace['pages'].values():
+            for stage in ('poll_gap', 'read', 'parse', 'wait'):
+                if span[stage] is not None:
+                    values[stage].append(span[stage])
+        values['align'].extend(trace['align'].values())
+        values['publish'].append(trace['publish'])
+        for display in trace['displays']:
+            for stage, seconds in display.items():
+                values[stage].append(seconds)
+    breakdown = {}
+    for stage, samples in values.items():
+        if samples:
+            samples.sort()
+            breakdown[stage] = {'n': len(samples), 'p50': samples[len(samples) // 2],
+                                'p90': samples[min(len(samples) - 1, int(0.9 * len(samples)))], 'max': samples[-1]}
+    return breakdown
+
+# Change detection: a hash of each book's odds region, computed inside the page.
+# When it matches the last cycle the book skips page_source, parsing and
+# alignment and the previous result is reused.
+FINGERPRINT_SELECTORS = {
+    'draftkings': '.event-cell__name-text, .sportsbook-outcome-cell__line, .sportsbook-odds, .sportsbook-empty-cell',
+    'betmgm': 'ms-six-pack-event',
+    'fanduel': 'div[data-test*="event"]',
+}
+FINGERPRINT_JS = r'''
+var nodes = document.querySelectorAll(arguments[0]);
+if (!nodes.length) nodes = [document.body];
+var h = 0x811c9dc5;  // FNV-1a over the outerHTML of the region
+for (var i = 0; i < nodes.length; i++) {
+    var s = nodes[i].outerHTML;
+    for (var j = 0; j < s.length; j++) {
+        h ^= s.charCodeAt(j);
+        h = Math.imul(h, 0x01000193);
+    }
+}
+return nodes.length + ':' + (h >>> 0).toString(16);
+'''
+
+page_fingerprints = {}  # page -> fingerprint of the page behind book_results[page]
+pending_fingerprints = {}  # page -> fingerprint of a read whose games aren't stored yet
+fingerprint_stats = {}  # page -> {'hits': n, 'misses': n}
+
+def page_fingerprint(driver, site):
+    selector = FINGERPRINT_SELECTORS.get(site)
+    if not selector:
+        return None
+    try:
+        return driver.execute_script(FINGERPRINT_JS, selector)
+    except Exception:
+        return None  # fall back to hashing page_source
+
+def record_fingerprint(site, fingerprint):
+    # True if the page changed since the result we already hold. The new
+    # fingerprint only replaces the old one once scrape_all_books has stored the
+    # games read with it (commit_fingerprint), so a parse that fails or a scrape
+    # that times out is read again next cycle instead of passing as unchanged.
+    stats = fingerprint_stats.setdefault(site, {'hits': 0, 'misses': 0})
+    if fingerprint == page_fingerprints.get(site) and site in book_results:
+        stats['hits'] += 1
+        pending_fingerprints.pop(site, None)
+        return False
+    stats['misses'] += 1
+    pending_fingerprints[site] = fingerprint
+    return True
+
+def commit_fingerprint(page):
+    if page in pending_fingerprints:
+        page_fingerprints[page] = pending_fingerprints.pop(page)
+
+def read_page(driver, page):
+    # The part of a scrape that needs Chrome: fingerprint, then the odds if they changed.
+    # Returns (fingerprint, changed, mode, data).
+    book = book_of(page)
+    if EXTRACT_MODES.get(book) == 'network':
+        return None, True, 'network', read_feed(driver, page)
+    fingerprint = page_fingerprint(driver, book)
+    changed = record_fingerprint(page, fingerprint) if fingerprint is not None else True
+    if not changed:
+        return fingerprint, changed, None, None
+    if EXTRACT_MODES.get(book) == 'browser':
+        return fingerprint, changed, 'browser', extract_in_browser(driver, book)
+    return fingerprint, changed, 'page_source', driver.page_source
+
+def scrape_book(page):
+    # Runs on a pool worker; only read_page holds the browser, parsing runs after
+    book = book_of(page)
+    started_at = time.time()
+    start = time.perf_counter()
+    fingerprint, changed, mode, data = read_tab(page, lambda driver: read_page(driver, page))
+    fetched = time.perf_counter()
+    observed_at = started_at + (fetched - start)
+    size = 0
+    if not changed:
+        games = book_results[page]
+    elif mode == 'network':
+        # The feed state's revision plays the fingerprint's part
+        if recorder is not None and data:
+            recorder.record(page, mode, data, cycle=cycle_timings['cycles'])
+        size = sum(map(len, data))
+        state = decode_feed(page, data)
+        changed = record_fingerprint(page, state['revision'])
+        games = feed_games(state) if changed else book_results[page]
+    elif mode == 'browser':
+        if recorder is not None:
+            recorder.record(page, mode, data, cycle=cycle_timings['cycles'])
+        games = from_browser_extract(book, data)
+        size = len(json.dumps(data))
+    else:
+        size = len(data)
+        if fingerprint is None:
+            # No in-page fingerprint; hashing the source still saves the parse
+            changed = record_fingerprint(page, hashlib.blake2b(data.encode(), digest_size=16).hexdigest())
+        if changed:
+            if recorder is not None:
+                recorder.record(page, mode, data, cycle=cycle_timings['cycles'])
+            games = parse_source(book, data)
+        else:
+            games = book_results[page]
+    if changed:
+        stamp_quotes(games, book_results.get(page), observed_at)
+    done = time.perf_counter()
+    scrape_fetch_seconds.observe(fetched - start, page=page)
+    if changed:
+        scrape_parse_seconds.observe(done - fetched, page=page, mode=mode)
+        scrape_payload_bytes.observe(size, page=page)
+    previous_read = book_timings.get(page, {}).get('observed_at')
+    book_timings[page] = {
+        'fetch': fetched - start, 'parse': done - fetched, 'total': done - start,
+        'bytes': size, 'unchanged': not changed, 'error': None, 'warning': scrape_warnings.get(book),
+        'at': time.time(), 'observed_at': observed_at, 'parsed_at': started_at + (done - start),
+        'poll_gap': observed_at - previous_read if previous_read else None,
+    }
+    return games
+
+def scrape_all_books(pool, pages=None):
+    # Scrapes `pages` (default: every page). Returns (results, pages whose result changed this cycle)
+    futures = {}
+    changed = set()
+    had_error = {}
+    for page in (page_health if pages is None else pages):
+        had_error[page] = bool(book_timings.get(page, {}).get('error'))
+        if pending(page):
+            book_timings[page] = dict(book_timings.get(page, {}), error='previous scrape or restart still running')
+            scrapes.inc(page=page, result='skipped')
+            continue
+        if page not in page_tabs:
+            book_timings[page] = dict(book_timings.get(page, {}), error='browser not running')
+            scrapes.inc(page=page, result='skipped')
+            continue
+        futures[page] = scrape_futures[page] = pool.submit(scrape_book, page)
+        page_health[page]['submitted'] = time.monotonic()
+    # All pages start together, so one shared deadline is a per-page timeout
+    deadline = time.monotonic() + SCRAPE_TIMEOUT
+    for page, future in futures.items():
+        health = page_health[page]
+        try:
+            book_results[page] = future.result(timeout=max(0, deadline - time.monotonic()))
+            commit_fingerprint(page)
+            with page_observed_lock:
+                page_observed[page] = book_timings[page]['observed_at']
+            health['consecutive_errors'] = 0
+            health['last_ok'] = time.time()
+            if not book_timings[page]['unchanged']:
+                health['last_change'] = health['last_ok']
+            if had_error[page] or not book_timings[page]['unchanged']:
+                changed.add(page)
+            scrapes.inc(page=page, result='unchanged' if book_timings[page]['unchanged'] else 'changed')
+        except FutureTimeout:
+            pending_fingerprints.pop(page, None)
+            book_timings[page] = dict(book_timings.get(page, {}), error=f'timed out after {SCRAPE_TIMEOUT}s')
+            health['consecutive_errors'] += 1
+            changed.add(page)
+            scrapes.inc(page=page, result='timeout')
+        except Exception as e:
+            pending_fingerprints.pop(page, None)
+            book_timings[page] = dict(book_timings.get(page, {}), error=str(e))
+            health['consecutive_errors'] += 1
+            changed.add(page)
+            scrapes.inc(page=page, result='error')
+    return book_results, changed
+
+# Adaptive polling. Every page has its own interval: it shrinks while the page's
+# odds keep changing and grows while they don't, drops to ARB_INTERVAL while one
+# of its prices is part of an open arb, and idles at IDLE_INTERVAL when the page
+# lists no games. If the pages together would spend more than CPU_BUDGET of the
+# time scraping, every interval is stretched to fit.
+MIN_INTERVAL = 1.0
+NETWORK_MIN_INTERVAL = 0.25  # 'network' pages only drain a log, so they can follow pushes closely
+MAX_INTERVAL = 30.0
+ARB_INTERVAL = 1.0
+IDLE_INTERVAL = 30.0
+TIGHTEN = 0.7  # interval multiplier after a scrape that saw a change
+BACK_OFF = 1.25  # ...and after one that didn't
+CPU_BUDGET = 0.5  # sum over books of scrape time / interval, i.e. share of one core
+CHANGE_RATE_ALPHA = 0.2  # EWMA weight of the latest scrape in change_rate / cost
+SCHEDULER_TICK = 1.0  # longest the loop sleeps, so the supervisor still runs between scrapes
+
+# site -> {'wanted': interval before the CPU budget, 'interval': after it, 'reason', ...}
+book_schedule = {}
+
+def schedule_for(site):
+    return book_schedule.setdefault(site, {
+        'wanted': SCRAPE_INTERVAL, 'interval': SCRAPE_INTERVAL, 'why': 'start', 'reason': 'start',
+        'change_rate': 0.0, 'cost': 0.0, 'last_run': 0.0, 'due': 0.0,
+    })
+
+def due_books(now):
+    return [page for page in page_health if schedule_for(page)['due'] <= now]
+
+def arb_books():
+    # Pages with a price that is a leg of an open arb
+    return {page_key(leg['book'], arb.get('league', ACTIVE_LEAGUES[0])) for arb in latest_snapshot.arbs for leg in arb['legs']}
+
+def reschedule(site, changed, now):
+    # Picks the next interval for a book that was just scraped
+    entry = schedule_for(site)
+    timing = book_timings.get(site, {})
+    entry['change_rate'] += CHANGE_RATE_ALPHA * (changed - entry['change_rate'])
+    entry['cost'] += CHANGE_RATE_ALPHA * ((timing.get('total') or 0) - entry['cost'])
+    entry['last_run'] = now
+    if timing.get('error'):
+        interval, reason = SCRAPE_INTERVAL, 'error'
+    elif not book_results.get(site):
+        interval, reason = IDLE_INTERVAL, 'no events'
+    elif site in arb_books():
+        interval, reason = ARB_INTERVAL, 'arb open'
+    elif changed:
+        floor = NETWORK_MIN_INTERVAL if EXTRACT_MODES.get(book_of(site)) == 'network' else MIN_INTERVAL
+        interval, reason = max(floor, entry['wanted'] * TIGHTEN), 'moving'
+    else:
+        interval, reason = min(MAX_INTERVAL, entry['wanted'] * BACK_OFF), 'quiet'
+    entry['wanted'], entry['why'] = interval, reason
+    apply_cpu_budget()
+
+def apply_cpu_budget():
+    # Stretch every interval by the same factor when the books together exceed CPU_BUDGET
+    load = sum(entry['cost'] / entry['wanted'] for entry in book_schedule.values())
+    scale = load / CPU_BUDGET if load > CPU_BUDGET else 1.0
+    for entry in book_schedule.values():
+        entry['interval'] = entry['wanted'] * scale
+        entry['reason'] = entry['why'] + (' (cpu budget)' if scale > 1 else '')
+        entry['due'] = entry['last_run'] + entry['interval']
+    cycle_timings['scrape_load'] = round(load, 3)
+
+def schedule_report():
+    now = time.monotonic()
+    return {site: {'interval': round(entry['interval'], 2), 'reason': entry['reason'],
+                   'change_rate': round(entry['change_rate'], 3), 'cost': round(entry['cost'], 3),
+                   'next_in': round(max(0.0, entry['due'] - now), 2)}
+            for site, entry in book_schedule.items()}
+
+TICK_DB = 'ticks.db'  # quote history; see tickstore.py
+tick_store = None
+RECORD_DIR = os.environ.get('RECORD_DIR')  # set to archive every page read; see recorder.py and replay.py
+recorder = None
+
+REFERENCE_BOOK = 'draftkings'  # game order and team names come from this book
+unmatched_games = {}  # league -> site -> games that didn't align on the last build
+league_games = {}  # league -> (game blocks, arbs) from its last build
+
+BOOKS = ('draftkings', 'betmgm', 'fanduel')  # dashboard column order
+ARB_BANKROLL = 100  # default bankroll /arbs splits stakes for
+
+def build_moneyline_games(results, league=None):
+    # results: {site: [Game]} for one league. Returns (3-way game blocks, unmatched report, arbs).
+    # Every market of every book is stacked and evaluated once; the moneyline
+    # view feeds the dashboard columns, spread and total add to the arbs and to
+    # each block's 'markets' summary.
+    games_dk = results[REFERENCE_BOOK]
+    others = {site: results.get(site, []) for site in BOOKS if site != REFERENCE_BOOK}
+    aligned, unmatched = align_books(games_dk, others)
+    aligned[REFERENCE_BOOK] = games_dk
+    rows = [aligned[site] for site in BOOKS]
+    prices, lines = stack_markets(rows)
+    markets = evaluate_markets(prices, lines)
+    market = moneyline_view(markets)
+    games = get_moneyline_game_blocks_3way(games_dk, aligned['betmgm'], aligned['fanduel'], market)
+    keys = game_keys(games_dk, league or ACTIVE_LEAGUES[0])
+    for game, key, summary in zip(games, keys, market_summaries(markets, BOOKS, rows)):
+        game['key'] = key
+        game['markets'] = summary
+    observed = {site: page_observed.get(page_key(site, league or ACTIVE_LEAGUES[0])) for site in BOOKS}
+    arbs = (find_arbs(games_dk, market, BOOKS, rows, observed, keys)
+            + find_line_arbs(games_dk, markets, BOOKS, rows, observed, keys))
+    if league is not None:
+        for item in games + arbs:
+            item['league'] = league
+    return games, unmatched, arbs
+
+def league_results(results, league):
+    # {page: games} -> {book: games} for one league
+    return {book: results[page_key(book, league)] for book in LEAGUES[league] if page_key(book, league) in results}
+
+def update_table(key, site, results, league):
+    error = book_timings.get(page_key(site, league), {}).get('error')
+    if error:
+        latest_tables[key] = f"Error: {error}"
+    elif site in results:
+        latest_tables[key] = get_moneyline_table(results[site])
+
 def scrape_and_update_tables():
-    while True:
+    # The only place the WebDriver sessions are read from once Flask is up
+    if not page_health:
+        return  # no pages to scrape; a pool needs at least one worker
+    with ThreadPoolExecutor(max_workers=len(page_health), thread_name_prefix='scrape') as pool:
+        while True:
+            supervise_drivers(pool)
+            now = time.monotonic()
+            due = due_books(now)
+            if not due:
+                next_due = min(entry['due'] for entry in book_schedule.values())
+                time.sleep(min(SCHEDULER_TICK, max(0.0, next_due - now)))
+                continue
+            cycle_start = time.perf_counter()
+            results, changed = scrape_all_books(pool, due)
+            publish_observed()
+            now = time.monotonic()
+            for site in due:
+                reschedule(site, site in changed, now)
+            if not changed and latest_snapshot.version:
+                # Nothing moved on any book: skip alignment and keep the current snapshot
+                cycle_timings['skipped'] += 1
+                cycle_timings['last'] = time.perf_counter() - cycle_start
+                cycle_timings['cycles'] += 1
+                cycle_seconds.observe(cycle_timings['last'])
+                continue
+            if rebuild_leagues(results, changed) and cycle_timings['first_snapshot'] is None:
+                cycle_timings['first_snapshot'] = round(time.perf_counter() - process_started, 3)
+            cycle_timings['last'] = time.perf_counter() - cycle_start
+            cycle_timings['cycles'] += 1
+            cycle_seconds.observe(cycle_timings['last'])
+
+def rebuild_leagues(results, changed, at=None):
+    # Re-aligns the leagues with a changed page (the rest reuse their last build)
+    # and publishes the result. Returns whether a snapshot was published.
+    rebuilt = False
+    aligned = {}  # league -> (start, end) wall times of its build, for the trace
+    for league in ACTIVE_LEAGUES:
+        if not any(league_of(page) == league for page in changed):
+            continue
+        by_book = league_results(results, league)
+        if tick_store is not None:
+            tick_store.record(by_book, league, at)
+        if league == ACTIVE_LEAGUES[0]:
+            update_table('dk', 'draftkings', by_book, league)
+            update_table('bm', 'betmgm', by_book, league)
+        if REFERENCE_BOOK not in by_book:
+            continue
         try:
-            soup_dk = get_soup_persistent('draftkings')
-            teams_dk, odds_dk = SCRAPERS['draftkings'](soup_dk)
-            soup_bm = get_soup_persistent('betmgm')
-            teams_bm, odds_bm = SCRAPERS['betmgm'](soup_bm)
-            latest_tables['dk'] = get_moneyline_table(teams_dk, odds_dk)
-            latest_tables['bm'] = get_moneyline_table(teams_bm, odds_bm)
+            start = time.time()
+            games, unmatched, arbs = build_moneyline_games(by_book, league)
+            aligned[league] = (start, time.time())
+            align_seconds.observe(aligned[league][1] - start, league=league)
         except Exception as e:
+            # Keep serving the league's last good games
             latest_tables['dk'] = f"Error: {e}"
             latest_tables['bm'] = f"Error: {e}"
-        time.sleep(3)  # Scrape every 5 seconds
+            continue
+        league_games[league] = (games, arbs)
+        unmatched_games[league] = unmatched
+        rebuilt = True
+    if rebuilt:
+        built = [league_games[league] for league in ACTIVE_LEAGUES if league in league_games]
+        snap = publish_snapshot([g for games, _ in built for g in games], [a for _, arbs in built for a in arbs])
+        trace_snapshot(snap, changed, aligned)
+    return rebuilt
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -259,14 +1997,6 @@ HTML_TEMPLATE = '''
 <script>
 let previousOdds = {};
 
-function oddsToInt(odds) {
-    if (typeof odds !== 'string') return null;
-    if (!odds.trim()) return null;
-    // Remove +, convert to int
-    let n = parseInt(odds.replace('+', ''));
-    return isNaN(n) ? null : n;
-}
-
 function getOddsKey(game, team, site) {
     return `${game.team1}|${game.team2}|${team}|${site}`;
 }
@@ -299,11 +2029,10 @@ function reloadOdds() {
                 let key = getOddsKey(game, team, site);
                 let el = document.getElementById(key);
                 if (!el) continue;
-                let newVal = (site === 'dk') ? (team === game.team1 ? game.dk1 : game.dk2) : (team === game.team1 ? game.bm1 : game.bm2);
-                let prevVal = previousOdds[key];
-                let newInt = oddsToInt(newVal);
-                let prevInt = oddsToInt(prevVal);
-                if (prevVal !== undefined && newInt !== null && prevInt !== null && newInt !== prevInt) {
+                // Prices come as integers, 0 where a book has no odds
+                let newInt = game.prices[site + (team === game.team1 ? '1' : '2')];
+                let prevInt = previousOdds[key];
+                if (prevInt !== undefined && newInt && prevInt && newInt !== prevInt) {
                     // For American odds: higher is better for underdog (+), lower is better for favorite (-)
                     let isImprovement = false;
                     if (prevInt < 0 && newInt > prevInt) isImprovement = true; // -120 to -110 is better
@@ -314,7 +2043,7 @@ function reloadOdds() {
                     el.classList.add(isImprovement ? 'odds-up' : 'odds-down');
                     setTimeout(() => { el.classList.remove('odds-up', 'odds-down'); }, 2500);
                 }
-                previousOdds[key] = newVal;
+                previousOdds[key] = newInt;
             }
         }
     });
@@ -325,84 +2054,317 @@ setInterval(reloadOdds, 5000); // 5 seconds
 </html>
 '''
 
-def get_moneyline_game_blocks(teams_dk, odds_dk, odds_bm):
+def quote(game, slot):
+    # Price in a slot of an aligned game, MISSING when the book has no such game
+    return game.prices[slot] if game is not None else MISSING
+
+def changed_at(game, slot):
+    # When that price last moved, None when the book has no such game
+    return game.changed[slot] if game is not None and game.changed is not None else None
+
+def get_moneyline_game_blocks(games_dk, games_bm):
     # Returns a list of dicts: [{team1, team2, dk1, dk2, bm1, bm2}, ...] for block rendering
-    num_games = len(teams_dk) // 2
     games = []
-    for i in range(num_games):
-        t1 = teams_dk[i*2].text.strip()
-        t2 = teams_dk[i*2+1].text.strip()
-        dk1 = odds_dk[i*6+2] if i*6+2 < len(odds_dk) else ''
-        dk2 = odds_dk[i*6+5] if i*6+5 < len(odds_dk) else ''
-        bm1 = odds_bm[i*6+2] if i*6+2 < len(odds_bm) else ''
-        bm2 = odds_bm[i*6+5] if i*6+5 < len(odds_bm) else ''
-        games.append({'team1': t1, 'team2': t2, 'dk1': dk1, 'dk2': dk2, 'bm1': bm1, 'bm2': bm2})
+    for dk, bm in zip(games_dk, games_bm):
+        prices = {'dk1': dk.prices[2], 'dk2': dk.prices[5], 'bm1': quote(bm, 2), 'bm2': quote(bm, 5)}
+        game = {'team1': dk.team1, 'team2': dk.team2, 'prices': prices}
+        game.update((key, format_american(price)) for key, price in prices.items())
+        games.append(game)
     return games
 
-def align_betmgm_to_draftkings(teams_dk, odds_dk, teams_bm, odds_bm):
-    # Build a mapping from team name to (index, odds) for BetMGM
-    bm_games = []
-    for i in range(0, len(teams_bm), 2):
-        t1 = teams_bm[i].text.strip()
-        t2 = teams_bm[i+1].text.strip() if i+1 < len(teams_bm) else ''
-        o = odds_bm[i//2*6:(i//2+1)*6]
-        bm_games.append(((t1, t2), o))
-    # For each DraftKings game, find the matching BetMGM game (by team set)
-    aligned_odds_bm = []
-    for i in range(0, len(teams_dk), 2):
-        dk_t1 = teams_dk[i].text.strip()
-        dk_t2 = teams_dk[i+1].text.strip() if i+1 < len(teams_dk) else ''
-        found = False
-        for (bm_t1, bm_t2), bm_odds in bm_games:
-            if set([dk_t1, dk_t2]) == set([bm_t1, bm_t2]):
-                aligned_odds_bm.extend(bm_odds)
-                found = True
-                break
-        if not found:
-            aligned_odds_bm.extend(['']*6)
-    return aligned_odds_bm
-
-def run_flask_moneyline():
+def matchup_key(t1, t2):
+    # Order-independent key, so 'A vs B' on one book finds 'B @ A' on another
+    t1, t2 = t1.strip(), t2.strip()
+    return (t1, t2) if t1 <= t2 else (t2, t1)
+
+def game_keys(games_ref, league):
+    # 'league|team1|team2|n' per reference game, n counting the games of that
+    # matchup in page order (doubleheaders), as align_books pairs them. Blocks,
+    # snapshot deltas, arbs and the dashboards identify games by it.
+    seen = {}
+    keys = []
+    for game in games_ref:
+        matchup = (game.team1, game.team2)
+        n = seen[matchup] = seen.get(matchup, -1) + 1
+        keys.append(f'{league}|{game.team1}|{game.team2}|{n}')
+    return keys
+
+def index_games(games):
+    # matchup key -> every game with those teams, in page order. Doubleheaders
+    # keep one entry per game.
+    index = {}
+    for game in games:
+        index.setdefault(matchup_key(game.team1, game.team2), []).append(game)
+    return index
+
+# Slot order of a game listed the other way round: spreads and moneylines
+# follow the teams, totals stay over (first row) / under
+REVERSED_SLOTS = (3, 1, 5, 0, 4, 2)
+
+def oriented(game, ref):
+    # game with its teams in the reference game's order
+    if game.team1.strip() == ref.team1.strip():
+        return game
+    flipped = Game(game.team2, game.team1, [game.prices[i] for i in REVERSED_SLOTS],
+                   [game.lines[i] for i in REVERSED_SLOTS])
+    if game.changed is not None:
+        flipped.changed = [game.changed[i] for i in REVERSED_SLOTS]
+    return flipped
+
+def align_books(games_ref, books):
+    # Join any number of books onto the reference book's games with one dict
+    # lookup per game. books: {site: [Game]}.
+    # Returns ({site: [Game or None] per reference game}, {site: unmatched report});
+    # the n-th game of a matchup on one book pairs with the n-th on the other.
+    # Games a book lists the other way round come back turned to the reference order.
+    ref_keys = [matchup_key(game.team1, game.team2) for game in games_ref]
+    aligned = {}
+    unmatched = {}
+    for site, games in books.items():
+        index = index_games(games)
+        used = {}
+        row = []
+        missing = []
+        for ref, key in zip(games_ref, ref_keys):
+            candidates = index.get(key, ())
+            n = used.get(key, 0)
+            if n < len(candidates):
+                row.append(oriented(candidates[n], ref))
+                used[key] = n + 1
+            else:
+                row.append(None)
+                missing.append(key)
+        extra = [key for key, candidates in index.items() for _ in range(len(candidates) - used.get(key, 0))]
+        aligned[site] = row
+        unmatched[site] = {'missing': missing, 'unused': extra}
+    return aligned, unmatched
+
+def align_betmgm_to_draftkings(games_dk, games_bm):
+    # Single-book form of align_books, kept for existing callers
+    aligned, _ = align_books(games_dk, {'other': games_bm})
+    return aligned['other']
+
+SERVE_HOST = '0.0.0.0'
+SERVE_PORT = 5000
+SERVE_THREADS = 64  # worker threads; every open /stream connection holds one
+MAX_STREAMS = 48  # open /stream connections; the other threads stay free for polling and the pages
+STREAM_RETRY = 10  # seconds a dashboard turned away from /stream waits before trying again
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+def create_app():
     app = Flask(__name__)
 
+    @app.before_request
+    def start_timer():
+        flask.g.request_started = time.perf_counter()  # qualified: g is the game index in the array code
+
+    @app.after_request
+    def observe_latency(response):
+        http_request_seconds.observe(time.perf_counter() - flask.g.request_started,
+                                     endpoint=request.endpoint or 'unknown', status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+    # Handlers only read the published snapshot, never the drivers
     @app.route('/')
     def index():
-        teams_dk, odds_dk = get_current_teams_odds('draftkings')
-        teams_bm, odds_bm = get_current_teams_odds('betmgm')
-        teams_fd, odds_fd = get_current_teams_odds('fanduel')
-        aligned_odds_bm = align_betmgm_to_draftkings(teams_dk, odds_dk, teams_bm, odds_bm)
-        aligned_odds_fd = align_betmgm_to_draftkings(teams_dk, odds_dk, teams_fd, odds_fd)
-        games = get_moneyline_game_blocks_3way(teams_dk, odds_dk, aligned_odds_bm, aligned_odds_fd)
-        return render_template_string(HTML_TEMPLATE_3WAY, games=games)
+        snap = get_snapshot()
+        return render_template_string(HTML_TEMPLATE_3WAY, games=snap.games, stale_after=STALE_AFTER,
+                                      stream_retry=STREAM_RETRY)
 
     @app.route('/odds_json')
     def odds_json():
-        teams_dk, odds_dk = get_current_teams_odds('draftkings')
-        teams_bm, odds_bm = get_current_teams_odds('betmgm')
-        teams_fd, odds_fd = get_current_teams_odds('fanduel')
-        aligned_odds_bm = align_betmgm_to_draftkings(teams_dk, odds_dk, teams_bm, odds_bm)
-        aligned_odds_fd = align_betmgm_to_draftkings(teams_dk, odds_dk, teams_fd, odds_fd)
-        games = get_moneyline_game_blocks_3way(teams_dk, odds_dk, aligned_odds_bm, aligned_odds_fd)
-        return {'games': games}
-
-    def get_current_teams_odds(site):
-        if site == 'draftkings':
-            soup = get_soup_persistent('draftkings')
-            return SCRAPERS['draftkings'](soup)
-        elif site == 'betmgm':
-            soup = get_soup_persistent('betmgm')
-            return SCRAPERS['betmgm'](soup)
-        else:
-            soup = get_soup_persistent('fanduel')
-            return SCRAPERS['fanduel'](soup)
+        # ETag per version and encoding; ?since=<version> returns only the games that changed
+        snap = get_snapshot()
+        since = request.args.get('since', type=int)
+        if since is not None and snapshot_at(since) is None:
+            since = None  # unknown or expired: the full body, under the full body's ETag and cache entry
+        gzipped = request.accept_encodings['gzip'] > 0
+        etag = str(snap.version) if since is None else f'{since}-{snap.version}'
+        if gzipped:
+            etag += '-gz'
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding'})
+        response = Response(encoded_odds(snap, since, gzipped), mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    @app.route('/stream')
+    def stream():
+        # Server-Sent Events: pushed as soon as the scraper publishes, no polling.
+        # A stream holds its thread until the client leaves, so past MAX_STREAMS
+        # it is refused rather than let the streams take every thread.
+        if not stream_slots.acquire(blocking=False):
+            return Response('too many streams; poll /odds_json', status=503, mimetype='text/plain',
+                            headers={'Retry-After': str(STREAM_RETRY)})
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        response = Response(stream_snapshots(), mimetype='text/event-stream', headers=headers)
+        response.call_on_close(stream_slots.release)  # the server closes every response, even one never read
+        return response
+
+    @app.route('/arbs')
+    def arbs():
+        # ?fresh=1 leaves out arbs whose legs were read more than MAX_QUOTE_SKEW apart;
+        # ?market=spread|total|moneyline keeps one market
+        snap = get_snapshot()
+        bankroll = request.args.get('bankroll', ARB_BANKROLL, type=float)
+        fresh = request.args.get('fresh', 0, type=int)
+        market = request.args.get('market')
+        result = []
+        for arb in snap.arbs:
+            if fresh and arb.get('stale'):
+                continue
+            if market and arb['market'] != market:
+                continue
+            legs = [dict(leg, stake=round(leg['stake_fraction'] * bankroll, 2)) for leg in arb['legs']]
+            result.append(dict(arb, legs=legs, payout=round(bankroll / (1 - arb['margin']), 2)))
+        return {'version': snap.version, 'published_at': snap.published_at, 'bankroll': bankroll, 'arbs': result}
+
+    @app.route('/middles')
+    def middles():
+        # Spread and total pairs whose lines overlap, from each block's market
+        # summary: both legs win inside the window, and cost is what the pair
+        # loses (% of the stakes) when the result lands outside it
+        snap = get_snapshot()
+        bankroll = request.args.get('bankroll', ARB_BANKROLL, type=float)
+        result = []
+        for game in snap.games:
+            for market, summary in game.get('markets', {}).items():
+                middle = summary.get('middle')
+                if middle is None:
+                    continue
+                legs = [dict(leg, stake=round(leg['stake_fraction'] * bankroll, 2)) for leg in middle['legs']]
+                result.append(dict(middle, team1=game['team1'], team2=game['team2'], league=game.get('league'),
+                                   market=market, legs=legs))
+        return {'version': snap.version, 'published_at': snap.published_at, 'bankroll': bankroll, 'middles': result}
+
+    @app.route('/observed')
+    def observed():
+        # When each page was last read, for clients polling /odds_json
+        return {'now': time.time(), 'observed': observed_times()}
+
+    @app.route('/trace')
+    def trace():
+        # Latency breakdown per stage, and the most recent snapshot traces
+        return {'stages': trace_breakdown(), 'traces': list(traces)[-request.args.get('n', 20, type=int):]}
+
+    @app.route('/display', methods=['POST'])
+    def display():
+        # Dashboards report {version, received, rendered} (epoch seconds) for tracing
+        report = request.get_json(force=True, silent=True) or {}
+        try:
+            found = record_display(int(report['version']), float(report['received']), float(report['rendered']))
+        except (KeyError, TypeError, ValueError):
+            return {'error': 'expected version, received and rendered'}, 400
+        return {'recorded': found}
+
+    def no_tick_store():
+        # Live replays and other embedders may serve without a TickStore
+        return {'error': 'no quote history: the server runs without a tick store'}, 503
+
+    @app.route('/history')
+    def history():
+        # ?team1=&team2=[&book=&since=&until=&league=&date=&game=]: every price
+        # change for a game; the latest of the matchup unless league, date
+        # (YYYY-MM-DD) or game (doubleheader position, from 0) pick another
+        if tick_store is None:
+            return no_tick_store()
+        args = request.args
+        return {'ticks': tick_store.history(args['team1'], args['team2'], args.get('book'),
+                                           args.get('since', type=float), args.get('until', type=float),
+                                           args.get('league'), args.get('date'), args.get('game', 0, type=int))}
+
+    @app.route('/lines')
+    def lines():
+        # ?team1=&team2=[&league=&date=&game=]: opening vs current line per book,
+        # for the game /history would pick
+        if tick_store is None:
+            return no_tick_store()
+        args = request.args
+        return tick_store.opening_and_current(args['team1'], args['team2'], args.get('league'),
+                                              args.get('date'), args.get('game', 0, type=int))
+
+    @app.route('/time_to_move')
+    def time_to_move():
+        if tick_store is None:
+            return no_tick_store()
+        return tick_store.time_to_move(request.args.get('since', type=float))
 
+    @app.route('/stats')
+    def stats():
+        # The scrape threads keep writing these tables; serialize copies
+        return {
+            'snapshot_version': get_snapshot().version,
+            'stream_clients': len(snapshot_subscribers),
+            'cycle': cycle_timings,
+            'books': copy_table(book_timings),
+            'fingerprints': fingerprint_stats,
+            'feeds': {page: {'events': len(state['events']), 'revision': state['revision'],
+                             'messages': state['messages'], 'skipped': state['skipped']}
+                      for page, state in feed_states.items()},
+            'drivers': copy_table(driver_health),
+            'pages': copy_table(page_health),
+            'parse_processes': parse_pool_size,
+            'schedule': schedule_report(),
+            'unmatched': unmatched_games,
+            'ticks': tick_store.stats if tick_store is not None else None,
+            'recorder': recorder.stats if recorder is not None else None,
+        }
+
+    return app
+
+def make_server(app, host=SERVE_HOST, port=SERVE_PORT):
+    # waitress when it is installed, otherwise werkzeug's threaded server; neither
+    # runs the debugger or reloader. Returns (serve_forever, shutdown).
+    try:
+        import waitress
+    except ImportError:
+        from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+        class KeepAliveHandler(WSGIRequestHandler):
+            protocol_version = 'HTTP/1.1'  # reuse connections instead of one thread per request
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        class Server(ThreadedWSGIServer):
+            request_queue_size = 1024  # room for hundreds of clients connecting at once
+
+        server = Server(host, port, app, handler=KeepAliveHandler)
+        return server.serve_forever, server.shutdown
+    server = waitress.create_server(app, host=host, port=port, threads=SERVE_THREADS)
+    return server.run, server.close
+
+def run_flask_moneyline(debug=False):
+    app = create_app()
+
+    global tick_store, recorder
+    tick_store = TickStore(TICK_DB)
+    if RECORD_DIR:
+        recorder = Recorder(RECORD_DIR)
+    start_parse_pool()
     start_persistent_drivers()
     t = threading.Thread(target=scrape_and_update_tables, daemon=True)
     t.start()
     try:
-        app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
+        if debug:
+            app.run(host=SERVE_HOST, port=SERVE_PORT, debug=True, use_reloader=False)
+        else:
+            serve_forever, _ = make_server(app)
+            serve_forever()
     finally:
         close_persistent_drivers()
+        stop_parse_pool()
+        tick_store.close()
+        if recorder is not None:
+            recorder.close()
 
 # Helper for 3-way table
 HTML_TEMPLATE_3WAY = '''
@@ -423,6 +2385,11 @@ HTML_TEMPLATE_3WAY = '''
         .odds-down { color: #dc3545; font-weight: bold; transition: color 0.3s; }
         .odds-green { background-color: #d1e7dd; }
         .odds-blue { background-color: #cfe2ff; }
+        .odds-table td.fair { color: #6c757d; font-style: italic; }
+        .arb-note { margin-top: 0.5rem; font-weight: bold; color: #198754; }
+        .arb-note.stale { color: #6c757d; }
+        .odds-table td.stale { opacity: 0.45; }
+        .odds-table .age { display: block; font-size: 0.7rem; font-weight: normal; color: #adb5bd; }
     </style>
 </head>
 <body>
@@ -430,95 +2397,525 @@ HTML_TEMPLATE_3WAY = '''
     <h2>Moneyline Odds Comparison</h2>
     <div id="odds-blocks">
         {% for game in games %}
-        <div class="odds-block">
+        <div class="odds-block" data-key="{{ game.key }}">
             <table class="odds-table">
                 <tr>
                     <th style="text-align:left">Teams</th>
                     <th>DraftKings</th>
                     <th>BetMGM</th>
                     <th>FanDuel</th>
+                    <th>Fair</th>
                 </tr>
                 <tr>
                     <td class="team">{{ game.team1 }}</td>
                     <td class="{{ game.dk1_class }}">{{ game.dk1 }}</td>
                     <td class="{{ game.bm1_class }}">{{ game.bm1 }}</td>
                     <td class="{{ game.b365_1_class }}">{{ game.b365_1 }}</td>
+                    <td class="fair">{{ game.fair1 }}</td>
                 </tr>
                 <tr>
                     <td class="team">{{ game.team2 }}</td>
                     <td class="{{ game.dk2_class }}">{{ game.dk2 }}</td>
                     <td class="{{ game.bm2_class }}">{{ game.bm2 }}</td>
                     <td class="{{ game.b365_2_class }}">{{ game.b365_2 }}</td>
+                    <td class="fair">{{ game.fair2 }}</td>
                 </tr>
             </table>
+            {% if game.arb_margin %}<div class="arb-note">Arb: {{ game.arb_margin }}% guaranteed</div>{% endif %}
         </div>
         {% endfor %}
     </div>
 </div>
 <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-<!-- Odds highlighting JS can be extended for 3-way if needed -->
+<script>
+const SITES = ['dk', 'bm', 'b365_'];
+const BOOK_NAMES = {dk: 'draftkings', bm: 'betmgm', b365_: 'fanduel'};
+const STALE_AFTER = {{ stale_after }};  // seconds since a page was read before its quotes are greyed
+const STREAM_RETRY = {{ stream_retry }};  // seconds before retrying a /stream the server refused
+let blocks = new Map();
+let arbs = new Map();
+let observed = {};  // 'book:league' -> when the server last read that page
+let lastReport = 0;
+
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+}
+
+function gameKey(game) {
+    return game.key;  // league, matchup and doubleheader position (game_keys)
+}
+
+function renderBlock(game) {
+    let block = document.createElement('div');
+    block.className = 'odds-block';
+    block.dataset.key = gameKey(game);
+    let row = (team, n, fair) => `<tr><td class="team">${escapeHtml(team)}</td>` +
+        SITES.map(site => `<td class="${game[site + n + '_class']}" data-price="${site + n}">` +
+                          `${game[site + n]}<span class="age"></span></td>`).join('') +
+        `<td class="fair">${fair}</td></tr>`;
+    let arb = arbs.get(gameKey(game));
+    let note = '';
+    if (game.arb_margin && arb && arb.stale) {
+        note = `<div class="arb-note stale">Arb: ${game.arb_margin}%, but its legs were read ` +
+               `${arb.quote_skew.toFixed(1)}s apart</div>`;
+    } else if (game.arb_margin) {
+        note = `<div class="arb-note">Arb: ${game.arb_margin}% guaranteed</div>`;
+    }
+    block.innerHTML = `<table class="odds-table">
+        <tr><th style="text-align:left">Teams</th><th>DraftKings</th><th>BetMGM</th><th>FanDuel</th><th>Fair</th></tr>
+        ${row(game.team1, '1', game.fair1)}${row(game.team2, '2', game.fair2)}</table>` + note;
+    return block;
+}
+
+function age(seconds) {
+    seconds = Math.max(0, seconds);
+    if (seconds < 60) return `${Math.round(seconds)}s`;
+    if (seconds < 3600) return `${Math.round(seconds / 60)}m`;
+    return `${Math.round(seconds / 3600)}h`;
+}
+
+function refreshAges() {
+    // Under each price: how long since it moved. Greyed once its page hasn't been read for STALE_AFTER.
+    let now = Date.now() / 1000;
+    for (const {game, block} of blocks.values()) {
+        for (const site of SITES) {
+            let read = observed[`${BOOK_NAMES[site]}:${game.league}`];
+            for (const n of ['1', '2']) {
+                let key = site + n;
+                let el = block.querySelector(`[data-price="${key}"]`);
+                let moved = game.changed && game.changed[key];
+                if (!el || !game.prices[key]) continue;
+                el.querySelector('.age').textContent = moved ? age(now - moved) : '';
+                el.title = (moved ? `moved ${age(now - moved)} ago` : '') + (read ? `, read ${age(now - read)} ago` : '');
+                el.classList.toggle('stale', read !== undefined && now - read > STALE_AFTER);
+            }
+        }
+    }
+}
+
+function reportDisplay(version, received) {
+    // For the server's latency trace: when this snapshot arrived and was painted. Sampled, one per 5 s.
+    if (received - lastReport < 5) return;
+    lastReport = received;
+    requestAnimationFrame(() => setTimeout(() => {
+        let body = JSON.stringify({version, received, rendered: Date.now() / 1000});
+        navigator.sendBeacon('/display', new Blob([body], {type: 'application/json'}));
+    }));
+}
+
+function setArbs(list) {
+    // The blocks show moneylines; spread and total arbs are only in /arbs
+    list = list.filter(arb => (arb.market || 'moneyline') === 'moneyline');
+    arbs = new Map(list.map(arb => [arb.key, arb]));
+}
+
+function flashMoves(block, previous, game) {
+    // For American odds a higher number is always the better price
+    for (const [key, price] of Object.entries(game.prices)) {
+        let before = previous.prices[key];
+        if (!price || !before || price === before) continue;
+        let el = block.querySelector(`[data-price="${key}"]`);
+        el.classList.add(price > before ? 'odds-up' : 'odds-down');
+        setTimeout(() => el.classList.remove('odds-up', 'odds-down'), 2500);
+    }
+}
+
+function showAll(games) {
+    let container = document.getElementById('odds-blocks');
+    container.replaceChildren(...games.map(game => {
+        let block = renderBlock(game);
+        blocks.set(gameKey(game), {game, block});
+        return block;
+    }));
+}
+
+function connect() {
+    let stream = new EventSource('/stream');
+    stream.addEventListener('full', e => {
+        let received = Date.now() / 1000;
+        let data = JSON.parse(e.data);
+        blocks = new Map();
+        setArbs(data.arbs);
+        showAll(data.games);
+        refreshAges();
+        reportDisplay(data.version, received);
+    });
+    stream.addEventListener('observed', e => {
+        observed = JSON.parse(e.data).observed;
+        refreshAges();
+    });
+    stream.addEventListener('delta', e => {
+        let received = Date.now() / 1000;
+        let data = JSON.parse(e.data);
+        let container = document.getElementById('odds-blocks');
+        if (data.arbs) {
+            // An arb can turn stale (or fresh) without any of its game's prices moving
+            let before = arbs;
+            setArbs(data.arbs);
+            for (const key of new Set([...before.keys(), ...arbs.keys()])) {
+                let entry = blocks.get(key);
+                if (entry && (before.get(key) || {}).stale !== (arbs.get(key) || {}).stale) {
+                    let block = renderBlock(entry.game);
+                    entry.block.replaceWith(block);
+                    entry.block = block;
+                }
+            }
+        }
+        for (const key of data.removed) {
+            let entry = blocks.get(key);
+            if (entry) entry.block.remove();
+            blocks.delete(key);
+        }
+        for (const game of data.games) {
+            let key = gameKey(game);
+            let block = renderBlock(game);
+            let entry = blocks.get(key);
+            if (entry) {
+                entry.block.replaceWith(block);
+                flashMoves(block, entry.game, game);
+            } else {
+                container.appendChild(block);
+            }
+            blocks.set(key, {game, block});
+        }
+        if (data.order) container.replaceChildren(...data.order.map(key => blocks.get(key).block));
+        refreshAges();
+        reportDisplay(data.version, received);
+    });
+    // EventSource retries dropped connections itself but gives up on a refusal (503: server full)
+    stream.onerror = () => {
+        if (stream.readyState === EventSource.CLOSED) setTimeout(connect, STREAM_RETRY * 1000);
+    };
+}
+connect();
+setInterval(refreshAges, 1000);
+</script>
 </body>
 </html>
 '''
 
-def highlight_odds_row(odds_row):
-    # odds_row: list of odds strings (e.g. ['-150', '-170', '+140'])
-    odds_ints = []
-    for o in odds_row:
-        try:
-            if o and (o[0] == '+' or o[0] == '-'):  # American odds
-                odds_ints.append(int(o.replace('+', '')))
-            else:
-                odds_ints.append(None)
-        except Exception:
-            odds_ints.append(None)
-    # Find highest positive and least-magnitude negative
-    max_pos = None
-    max_pos_idx = None
-    min_neg = None
-    min_neg_idx = None
-    for idx, val in enumerate(odds_ints):
-        if val is not None:
-            if val > 0:
-                if max_pos is None or val > max_pos:
-                    max_pos = val
-                    max_pos_idx = idx
-            elif val < 0:
-                if min_neg is None or val > min_neg:  # closer to zero
-                    min_neg = val
-                    min_neg_idx = idx
-    # Assign classes
-    classes = [''] * len(odds_row)
-    if max_pos_idx is not None:
-        classes[max_pos_idx] = 'odds-green'
-    if min_neg_idx is not None:
-        classes[min_neg_idx] = 'odds-blue'
+# Cross-book moneyline engine. All books' prices for all games are stacked into
+# one (games, books, 2) array and evaluated in a single vectorized pass.
+def stack_moneylines(rows):
+    # rows: per book, the reference-aligned list of Game (or None)
+    n_games = len(rows[0]) if rows else 0
+    prices = np.zeros((n_games, len(rows), 2), dtype=np.int32)
+    for b, row in enumerate(rows):
+        for g, game in enumerate(row):
+            if game is not None:
+                prices[g, b, 0] = game.prices[2]
+                prices[g, b, 1] = game.prices[5]
+    return prices
+
+def american_from_probability(prob):
+    # Fair American odds for probabilities in (0, 1); 0 (MISSING) elsewhere
+    prob = np.asarray(prob, dtype=np.float64)
+    valid = (prob > 0) & (prob < 1)
+    p = np.where(valid, prob, 0.5)
+    odds = np.where(p >= 0.5, -100 * p / (1 - p), 100 * (1 - p) / p)
+    return np.where(valid, np.rint(odds), 0).astype(np.int32)
+
+def moneyline_picks(prices, implied):
+    # prices, implied: (games, books, 2) moneyline quotes, implied NaN where a book
+    # has none. Returns the no-vig fair probability per outcome and the dashboard
+    # highlight books (-1 where no book qualifies), each (games, 2).
+    # No-vig: each book's two-way market scaled to 100%, averaged over the books quoting both sides
+    two_way = ~np.isnan(implied).any(axis=2)
+    novig = np.where(two_way[..., None], implied / np.where(two_way, np.nansum(implied, axis=2), 1)[..., None], 0.0)
+    n_books = two_way.sum(axis=1)
+    fair_prob = np.where(n_books[:, None] > 0, novig.sum(axis=1) / np.maximum(n_books, 1)[:, None], np.nan)
+
+    # Highlights: highest plus price and the minus price closest to zero, per outcome
+    lowest = np.iinfo(np.int32).min
+    plus = prices > 0
+    minus = prices < 0
+    plus_book = np.where(plus.any(axis=1), np.where(plus, prices, lowest).argmax(axis=1), -1)
+    minus_book = np.where(minus.any(axis=1), np.where(minus, prices, lowest).argmax(axis=1), -1)
+    return fair_prob, plus_book, minus_book
+
+def evaluate_moneylines(prices):
+    # prices: (games, books, 2) American odds, MISSING where a book has no quote.
+    # Returns a dict of arrays: implied probabilities, best price and book per
+    # outcome, no-vig fair probabilities and lines, arbitrage margin and the stake
+    # split that locks it in, plus the dashboard highlight picks.
+    present = prices != MISSING
+    p = prices.astype(np.float64)
+    decimal = np.where(p > 0, 1 + p / 100, 1 + 100 / np.where(p < 0, -p, 1))
+    implied = np.where(present, 1 / decimal, np.nan)
+
+    # Best price per outcome is the highest decimal payout across books
+    payout = np.where(present, decimal, 0.0)
+    best_book = payout.argmax(axis=1)
+    quoted = present.any(axis=1)
+    best_price = np.where(quoted, np.take_along_axis(prices, best_book[:, None, :], axis=1)[:, 0, :], MISSING)
+    best_decimal = np.take_along_axis(payout, best_book[:, None, :], axis=1)[:, 0, :]
+    best_implied = np.where(quoted, 1 / np.where(quoted, best_decimal, 1), np.nan)
+
+    # Arbitrage when the best prices' implied probabilities sum below 100%;
+    # staking in proportion to them pays the same whichever side wins
+    total = best_implied.sum(axis=1)
+    complete = quoted.all(axis=1)
+    margin = np.where(complete, 1 - total, np.nan)
+    stake_fraction = np.where(complete[:, None], best_implied / np.where(complete, total, 1)[:, None], np.nan)
+    fair_prob, plus_book, minus_book = moneyline_picks(prices, implied)
+
+    return {
+        'implied': implied, 'best_book': np.where(quoted, best_book, -1), 'best_price': best_price,
+        'best_implied': best_implied, 'margin': margin, 'is_arb': margin > 0, 'stake_fraction': stake_fraction,
+        'fair_prob': fair_prob, 'fair_price': american_from_probability(fair_prob),
+        'plus_book': plus_book, 'minus_book': minus_book,
+    }
+
+def flag_quote_skew(arb):
+    # With every leg's observed_at known, flag arbs whose legs were read more than MAX_QUOTE_SKEW apart
+    seen = [leg['observed_at'] for leg in arb['legs'] if leg.get('observed_at') is not None]
+    if len(seen) == len(arb['legs']):
+        arb['quote_skew'] = max(seen) - min(seen)
+        arb['stale'] = arb['quote_skew'] > MAX_QUOTE_SKEW
+    return arb
+
+def find_arbs(games_ref, market, books, rows=None, observed=None, keys=None):
+    # One entry per game with an open moneyline arb; stakes are fractions of the bankroll.
+    # keys (from game_keys) tie each arb to its game's block.
+    # With rows (the aligned games per book) and observed (book -> time its page
+    # was last read), each leg says when its price moved and was last seen, and
+    # arbs whose legs were read more than MAX_QUOTE_SKEW apart are flagged stale.
+    arbs = []
+    for g in np.flatnonzero(market['is_arb']):
+        game = games_ref[g]
+        legs = []
+        for side, team in enumerate((game.team1, game.team2)):
+            b = market['best_book'][g, side]
+            leg = {
+                'team': team,
+                'book': books[b],
+                'price': int(market['best_price'][g, side]),
+                'stake_fraction': float(market['stake_fraction'][g, side]),
+            }
+            if rows is not None:
+                leg['changed_at'] = changed_at(rows[b][g], MONEYLINE_SLOTS[side])
+                leg['observed_at'] = (observed or {}).get(books[b])
+            legs.append(leg)
+        arb = {'team1': game.team1, 'team2': game.team2, 'market': 'moneyline',
+               'margin': float(market['margin'][g]), 'legs': legs}
+        if keys is not None:
+            arb['key'] = keys[g]
+        arbs.append(flag_quote_skew(arb))
+    return arbs
+
+# All three markets in one pass. stack_markets lays every book's six slots out
+# as (games, books, market, side) arrays of prices and lines; evaluate_markets
+# then prices every pairing of a side-1 leg at one book with a side-2 leg at
+# any book, as one (games, market, book, book) array. A pair covers every result
+# when its lines are complementary (an arb if its implied probabilities sum
+# below 1) and leaves a middle, where both legs win, when they overlap.
+MARKETS = ('spread', 'total', 'moneyline')
+SPREAD, TOTAL, MONEYLINE = range(3)
+# How a line's points favour the bettor, per market and side: a bigger handicap
+# on either spread side, a lower total for the over, a higher one for the under.
+# Summed over a pair's legs it is the pair's middle window in points.
+LINE_SIGNS = np.array([[1.0, 1.0], [-1.0, 1.0], [0.0, 0.0]])
+TOTAL_SIDES = ('over', 'under')
+MAX_MIDDLE_COST = 0.05  # worst-case loss, as a share of the stakes, of a middle worth reporting; -110/-110 costs 4.5%
+EMPTY_PRICES = array('i', [MISSING] * 6).tobytes()
+EMPTY_LINES = array('d', [NO_LINE] * 6).tobytes()
+
+def stack_markets(rows):
+    # rows: per book, the reference-aligned list of Game (or None).
+    # Returns (prices, lines), each (games, books, 3, 2): slot side * 3 + market.
+    # Each book's row is one bytes join of its games' arrays, not a loop over slots.
+    n_games = len(rows[0]) if rows else 0
+    prices = np.full((len(rows), n_games, 6), MISSING, dtype=np.int32)
+    lines = np.full((len(rows), n_games, 6), NO_LINE)
+    if n_games:
+        for b, row in enumerate(rows):
+            prices[b] = np.frombuffer(b''.join(EMPTY_PRICES if game is None else game.prices.tobytes()
+                                               for game in row), dtype=np.intc).reshape(n_games, 6)
+            lines[b] = np.frombuffer(b''.join(EMPTY_LINES if game is None else game.lines.tobytes()
+                                              for game in row), dtype=np.float64).reshape(n_games, 6)
+    shape = (len(rows), n_games, 2, 3)
+    return prices.reshape(shape).transpose(1, 0, 3, 2), lines.reshape(shape).transpose(1, 0, 3, 2)
+
+def evaluate_markets(prices, lines):
+    # prices, lines: (games, books, 3, 2) from stack_markets. A spread or total
+    # quote needs both; a moneyline only its price. Returns a dict of arrays:
+    #   hold (games, books, 3): each book's overround where it quotes both sides at complementary lines
+    #   best_book / best_price / best_line (games, 3, 2): the most favourable line per side, best price at it
+    #   arb_books (games, 3, 2), arb_margin, arb_window, is_arb (games, 3): the best covering pair of legs
+    #   middle_books, middle_window, middle_margin, is_middle: the best overlapping pair
+    #   middle_cost (games, 3): its loss, as a share of the stakes, when only one leg wins
+    #   stake_fraction / middle_stake_fraction (games, 3, 2): the equal-payout split of each pair
+    #   fair_price, plus_book, minus_book (games, 2): the moneyline's no-vig price and dashboard highlights
+    n_games, n_books = prices.shape[:2]
+    present = prices != MISSING
+    has_line = ~np.isnan(lines)
+    quoted = present & (has_line | (np.arange(3) == MONEYLINE)[:, None])
+    p = prices.astype(np.float64)
+    decimal = np.where(p > 0, 1 + p / 100, 1 + 100 / np.where(p < 0, -p, 1))
+    implied = np.where(quoted, 1 / decimal, np.nan)
+    points = np.where(quoted, np.where(has_line, lines, 0.0) * LINE_SIGNS, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        two_way = quoted.all(axis=3) & (points.sum(axis=3) == 0)
+        hold = np.where(two_way, 1 - 1 / np.where(two_way, implied.sum(axis=3), 1), np.nan)
+
+        best_points = np.where(quoted, points, -np.inf).max(axis=1)
+        payout = np.where(quoted & (points == best_points[:, None]), decimal, 0.0)
+        best_book = payout.argmax(axis=1)
+        any_quote = quoted.any(axis=1)
+        best_price = np.where(any_quote, np.take_along_axis(prices, best_book[:, None], axis=1)[:, 0], MISSING)
+        best_line = np.where(any_quote, np.take_along_axis(lines, best_book[:, None], axis=1)[:, 0], NO_LINE)
+
+        # Pairs: side 1 at book a (axis 2), side 2 at book b (axis 3)
+        imp = implied.transpose(0, 2, 1, 3)
+        pts = points.transpose(0, 2, 1, 3)
+        window = pts[..., :, None, 0] + pts[..., None, :, 1]
+        cost = imp[..., :, None, 0] + imp[..., None, :, 1]
+        imp1 = np.broadcast_to(imp[..., :, None, 0], cost.shape).reshape(n_games, 3, n_books * n_books)
+
+        def best_pair(candidates):
+            score = np.where(candidates, 1 - cost, -np.inf).reshape(n_games, 3, n_books * n_books)
+            pair = score.argmax(axis=2)
+            margin = np.take_along_axis(score, pair[..., None], axis=2)[..., 0]
+            found = np.isfinite(margin)
+            pair_cost = 1 - np.where(found, margin, 0.0)
+            first = np.take_along_axis(imp1, pair[..., None], axis=2)[..., 0]
+            stakes = np.stack([first / pair_cost, 1 - first / pair_cost], axis=-1)
+            books = np.stack(divmod(pair, n_books), axis=-1)
+            gap = np.take_along_axis(window.reshape(n_games, 3, n_books * n_books), pair[..., None], axis=2)[..., 0]
+            return (np.where(found[..., None], books, -1), np.where(found, margin, np.nan),
+                    np.where(found[..., None], stakes, np.nan), np.where(found, gap, np.nan))
+
+        arb_books, arb_margin, stake_fraction, arb_window = best_pair(window >= 0)
+        middle_books, middle_margin, middle_stakes, middle_window = best_pair(window > 0)
+        # Equal-payout stakes return 1 / (sum of implied) on the winning leg
+        middle_cost = 1 - 1 / (1 - middle_margin)
+        is_middle = middle_cost <= MAX_MIDDLE_COST
+
+    fair_prob, plus_book, minus_book = moneyline_picks(prices[:, :, MONEYLINE], implied[:, :, MONEYLINE])
+
+    return {
+        'hold': hold, 'best_book': np.where(any_quote, best_book, -1), 'best_price': best_price,
+        'best_line': best_line, 'arb_books': arb_books, 'arb_margin': arb_margin, 'arb_window': arb_window,
+        'is_arb': arb_margin > 0, 'stake_fraction': stake_fraction,
+        'middle_books': middle_books, 'middle_margin': middle_margin, 'middle_cost': middle_cost,
+        'middle_window': np.where(is_middle, middle_window, np.nan), 'is_middle': is_middle,
+        'middle_stake_fraction': middle_stakes,
+        'fair_price': american_from_probability(fair_prob), 'plus_book': plus_book, 'minus_book': minus_book,
+    }
+
+def moneyline_view(markets):
+    # The moneyline slice of evaluate_markets, under evaluate_moneylines' keys,
+    # for get_moneyline_game_blocks_3way and find_arbs. With no lines, a
+    # moneyline pair always covers, so the best pair is each side's best price.
+    margin = markets['arb_margin'][:, MONEYLINE]
+    return {
+        'best_book': markets['best_book'][:, MONEYLINE], 'best_price': markets['best_price'][:, MONEYLINE],
+        'margin': margin, 'is_arb': margin > 0, 'stake_fraction': markets['stake_fraction'][:, MONEYLINE],
+        'fair_price': markets['fair_price'], 'plus_book': markets['plus_book'], 'minus_book': markets['minus_book'],
+    }
+
+def pair_legs(game, g, m, books, rows, pair_books, stakes, observed=None):
+    # The two legs of a spread or total pair: who or what each backs, book,
+    # price, line and stake fraction; with observed, when each moved and was read
+    legs = []
+    for side, b in enumerate(pair_books):
+        quoted = rows[b][g]
+        slot = side * 3 + m
+        leg = {'team': (game.team1, game.team2)[side]} if m == SPREAD else {'side': TOTAL_SIDES[side]}
+        leg.update(book=books[b], price=quoted.prices[slot], line=quoted.lines[slot], stake_fraction=stakes[side])
+        if observed is not None:
+            leg['changed_at'] = changed_at(quoted, slot)
+            leg['observed_at'] = observed.get(books[b])
+        legs.append(leg)
+    return legs
+
+def find_line_arbs(games_ref, markets, books, rows, observed=None, keys=None):
+    # Spread and total arbs, laid out as find_arbs' moneyline ones. A positive
+    # window means the legs' lines overlap, so results inside it win both.
+    arbs = []
+    for g, m in zip(*np.nonzero(markets['is_arb'][:, :MONEYLINE])):
+        game = games_ref[g]
+        legs = pair_legs(game, g, m, books, rows, markets['arb_books'][g, m].tolist(),
+                         markets['stake_fraction'][g, m].tolist(), observed or {})
+        arb = {'team1': game.team1, 'team2': game.team2, 'market': MARKETS[m],
+               'margin': float(markets['arb_margin'][g, m]), 'legs': legs}
+        if markets['arb_window'][g, m] > 0:
+            arb['window'] = float(markets['arb_window'][g, m])
+        if keys is not None:
+            arb['key'] = keys[g]
+        arbs.append(flag_quote_skew(arb))
+    return arbs
+
+def market_summaries(markets, books, rows):
+    # Per game, {market: {'best': per side {book, price, line} or None,
+    # 'hold': {book: %}, 'middle': {...} if open}} for the markets any book quotes
+    hold = np.round(markets['hold'] * 100, 2).transpose(0, 2, 1).tolist()
+    middles = set(zip(*np.nonzero(markets['is_middle'])))
+    no_lines = (None, None)
+    summaries = []
+    for g, game_quotes in enumerate(zip(markets['best_book'].tolist(), markets['best_price'].tolist(),
+                                        markets['best_line'].tolist(), hold)):
+        summary = {}
+        for m, (side_books, prices, lines, holds) in enumerate(zip(*game_quotes)):
+            if side_books[0] < 0 and side_books[1] < 0:
+                continue
+            if m == MONEYLINE:
+                lines = no_lines
+            entry = {
+                'best': [None if b < 0 else {'book': books[b], 'price': price, 'line': line}
+                         for b, price, line in zip(side_books, prices, lines)],
+                'hold': {book: h for book, h in zip(books, holds) if h == h},
+            }
+            if (g, m) in middles:
+                entry['middle'] = {
+                    'window': float(markets['middle_window'][g, m]),
+                    'cost': round(float(markets['middle_cost'][g, m]) * 100, 2),
+                    'legs': pair_legs(rows[0][g], g, m, books, rows, markets['middle_books'][g, m].tolist(),
+                                      markets['middle_stake_fraction'][g, m].tolist()),
+                }
+            summary[MARKETS[m]] = entry
+        summaries.append(summary)
+    return summaries
+
+def highlight_classes(plus_book, minus_book, n_books):
+    classes = [''] * n_books
+    if plus_book >= 0:
+        classes[plus_book] = 'odds-green'
+    if minus_book >= 0:
+        classes[minus_book] = 'odds-blue'
     return classes
 
-def get_moneyline_game_blocks_3way(teams_dk, odds_dk, odds_bm, odds_fd):
-    num_games = len(teams_dk) // 2
+def get_moneyline_game_blocks_3way(games_dk, games_bm, games_fd, market=None):
+    # games_bm / games_fd are aligned to games_dk (None where a book lacks the game)
+    if market is None:
+        market = evaluate_moneylines(stack_moneylines([games_dk, games_bm, games_fd]))
+    plus_book = market['plus_book'].tolist()
+    minus_book = market['minus_book'].tolist()
+    fair_price = market['fair_price'].tolist()
+    margin = market['margin'].tolist()
     games = []
-    for i in range(num_games):
-        t1 = teams_dk[i*2].text.strip()
-        t2 = teams_dk[i*2+1].text.strip()
-        # Collect odds for each team from all books
-        dk1 = odds_dk[i*6+2] if i*6+2 < len(odds_dk) else ''
-        dk2 = odds_dk[i*6+5] if i*6+5 < len(odds_dk) else ''
-        bm1 = odds_bm[i*6+2] if i*6+2 < len(odds_bm) else ''
-        bm2 = odds_bm[i*6+5] if i*6+5 < len(odds_bm) else ''
-        fd1 = odds_fd[i*6+2] if i*6+2 < len(odds_fd) else ''
-        fd2 = odds_fd[i*6+5] if i*6+5 < len(odds_fd) else ''
+    for i, (dk, bm, fd) in enumerate(zip(games_dk, games_bm, games_fd)):
         # Highlight classes for each team row
-        row1 = [dk1, bm1, fd1]
-        row2 = [dk2, bm2, fd2]
-        classes1 = highlight_odds_row(row1)
-        classes2 = highlight_odds_row(row2)
-        games.append({
-            'team1': t1, 'team2': t2,
-            'dk1': dk1, 'dk2': dk2, 'bm1': bm1, 'bm2': bm2, 'b365_1': fd1, 'b365_2': fd2,
+        classes1 = highlight_classes(plus_book[i][0], minus_book[i][0], 3)
+        classes2 = highlight_classes(plus_book[i][1], minus_book[i][1], 3)
+        prices = {
+            'dk1': dk.prices[2], 'dk2': dk.prices[5], 'bm1': quote(bm, 2), 'bm2': quote(bm, 5),
+            'b365_1': quote(fd, 2), 'b365_2': quote(fd, 5),
+        }
+        changed = {
+            'dk1': changed_at(dk, 2), 'dk2': changed_at(dk, 5), 'bm1': changed_at(bm, 2), 'bm2': changed_at(bm, 5),
+            'b365_1': changed_at(fd, 2), 'b365_2': changed_at(fd, 5),
+        }
+        game = {
+            'team1': dk.team1, 'team2': dk.team2, 'prices': prices, 'changed': changed,
             'dk1_class': classes1[0], 'bm1_class': classes1[1], 'b365_1_class': classes1[2],
             'dk2_class': classes2[0], 'bm2_class': classes2[1], 'b365_2_class': classes2[2],
-        })
+            'fair1': format_american(fair_price[i][0]), 'fair2': format_american(fair_price[i][1]),
+            'arb_margin': round(margin[i] * 100, 2) if margin[i] > 0 else 0,
+        }
+        game.update((key, format_american(price)) for key, price in prices.items())
+        games.append(game)
     return games
 if __name__ == '__main__':
     # Set this to True to run Flask live odds GUI, False to just print odds for one site for testing
@@ -530,17 +2927,11 @@ if __name__ == '__main__':
         # For testing: print all scraped stats for the selected site once
         print(f"\n--- {TEST_SITE.upper()} ---")
         soup = get_soup(URLS[TEST_SITE])
-        teams, odds = SCRAPERS[TEST_SITE](soup)
-        num_games = len(teams) // 2
+        games = SCRAPERS[TEST_SITE](soup)
         headers = ["Spread", "Total", "Moneyline"]
-        for i in range(num_games):
+        for i, game in enumerate(games):
             print(f"Game {i + 1}:")
             print(f"{'':20}{headers[0]:>10}{headers[1]:>10}{headers[2]:>12}")
-            def get_odds_text(idx):
-                if idx < len(odds):
-                    val = odds[idx]
-                    return val.text if hasattr(val, 'text') else str(val)
-                return ''
-            print(f"{teams[i*2].text:20}{get_odds_text(i*6):>10}{get_odds_text(i*6+1):>10}{get_odds_text(i*6+2):>12}")
-            print(f"{teams[i*2+1].text:20}{get_odds_text(i*6+3):>10}{get_odds_text(i*6+4):>10}{get_odds_text(i*6+5):>12}")
+            print(f"{game.team1:20}{game.text(0):>10}{game.text(1):>10}{game.text(2):>12}")
+            print(f"{game.team2:20}{game.text(3):>10}{game.text(4):>10}{game.text(5):>12}")
             print()
\ No newline at end of file
@@ -0,0 +1,116 @@
+# Compare browser profiles: time until odds are visible, Chrome CPU time and
+# resident memory per book, for each profile in briansnake.BROWSER_PROFILES.
+#
+# By default the fixture pages are served locally with images, a stylesheet,
+# a web font and a CPU-hungry "analytics" script injected, so the lean
+# profile's request blocking has something to block. --live loads URLS instead.
+#
+#   python browser_bench.py                     # fixtures, full vs lean
+#   python browser_bench.py --live --profiles lean
+#
+# CPU and RSS are read from /proc for chromedriver and every process under it,
+# so they are only reported on Linux.
+import argparse
+import functools
+import http.server
+import os
+import threading
+import time
+
+import briansnake
+from check_fixtures import FIXTURES, FIXTURES_DIR
+
+ODDS_TIMEOUT = 30  # seconds to wait for odds before a book counts as failed
+ASSET_DELAY = 0.05  # seconds each injected asset takes to serve
+IMAGES_PER_PAGE = 20
+
+INJECTED_ASSETS = (
+    '<link rel="stylesheet" href="/asset/site.css">'
+    '<link rel="preload" as="font" href="/asset/brand.woff2" crossorigin>'
+    '<script src="/asset/www.google-analytics.com/analytics.js"></script>'
+    + ''.join(f'<img src="/asset/promo{i}.png">' for i in range(IMAGES_PER_PAGE))
+)
+ANALYTICS_JS = b'(function () { var end = Date.now() + 300; while (Date.now() < end) {} })();'
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    # /page/<fixture> is the fixture with INJECTED_ASSETS; /asset/* are slow dummy payloads
+    def do_GET(self):
+        if self.path.startswith('/page/'):
+            with open(os.path.join(FIXTURES_DIR, os.path.basename(self.path)), 'rb') as f:
+                body = f.read().replace(b'</head>', INJECTED_ASSETS.encode() + b'</head>', 1)
+            return self.reply(body, 'text/html')
+        if self.path.startswith('/asset/'):
+            time.sleep(ASSET_DELAY)
+            if self.path.endswith('.js'):
+                return self.reply(ANALYTICS_JS, 'application/javascript')
+            return self.reply(os.urandom(64 * 1024), 'application/octet-stream')
+        return super().do_GET()
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_pages():
+    handler = functools.partial(FixtureHandler, directory=FIXTURES_DIR)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}/page'
+    return server, {site: f'{base}/{names[0]}' for site, names in FIXTURES.items()}
+
+
+def time_to_odds(driver, site, url):
+    # Seconds from navigation until the book's extractor sees at least one game
+    start = time.perf_counter()
+    driver.get(url)
+    while time.perf_counter() - start < ODDS_TIMEOUT:
+        try:
+            if briansnake.from_browser_extract(site, briansnake.extract_in_browser(driver, site)):
+                return time.perf_counter() - start
+        except Exception:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure(profile, urls):
+    driver = briansnake.new_driver(profile)
+    pid = driver.service.process.pid
+    rows = []
+    try:
+        for site, url in urls.items():
+            cpu_before, _ = briansnake.tree_usage(pid)
+            seconds = time_to_odds(driver, site, url)
+            cpu_after, rss = briansnake.tree_usage(pid)
+            rows.append((site, seconds, cpu_after - cpu_before, rss))
+    finally:
+        driver.quit()
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Browser profile comparison')
+    parser.add_argument('--profiles', default=','.join(briansnake.BROWSER_PROFILES))
+    parser.add_argument('--live', action='store_true', help='load the real sportsbook URLS')
+    args = parser.parse_args()
+    server = None
+    if args.live:
+        urls = briansnake.URLS
+    else:
+        server, urls = serve_pages()
+    try:
+        print(f"{'profile':8} {'book':11} {'odds visible':>13} {'cpu':>8} {'rss':>9}")
+        for profile in args.profiles.split(','):
+            for site, seconds, cpu, rss in measure(profile, urls):
+                visible = f'{seconds * 1000:.0f} ms' if seconds is not None else 'timeout'
+                print(f'{profile:8} {site:11} {visible:>13} {cpu:7.2f}s {rss:6.0f} MiB')
+    finally:
+        if server:
+            server.shutdown()
@@ -0,0 +1,255 @@
+# Offline checks against the saved sportsbook pages in fixtures/.
+# Run `python check_fixtures.py`; exits non-zero if any check fails.
+# Checks that need Chrome are skipped when it can't be started.
+import functools
+import http.server
+import os
+import sys
+import threading
+import time
+
+import briansnake
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# site -> saved pages for that book
+FIXTURES = {
+    'draftkings': ['draftkings.html'],
+    'betmgm': ['betmgm.html'],
+    'fanduel': ['fanduel.html', 'fanduel_fallback.html'],
+}
+
+# site -> (saved page, the feed its odds came from, pushes applied after it).
+# Served from fixtures/ under paths that match briansnake.FEED_URLS.
+FEED_FIXTURES = {
+    'draftkings': ('draftkings.html', 'feeds/sportscontent/draftkings.json',
+                   ['feeds/sportscontent/draftkings_push.json']),
+    'betmgm': ('betmgm.html', 'feeds/cds-api/bettingoffer/betmgm.json', []),
+    'fanduel': ('fanduel.html', 'feeds/content-managed-page/fanduel.json', []),
+}
+# What the pushes change: site -> {(team1, team2): (moneyline1, moneyline2)}
+FEED_PUSHED = {'draftkings': {('Yankees', 'Red Sox'): (-155, 135)}}
+
+# Spread and total lines shown on the pages, as (team1 spread, over, team2 spread, under)
+# in the page's own team order; None where the page shows no line
+FIXTURE_LINES = {
+    'draftkings': {('Yankees', 'Red Sox'): (-1.5, 8.5, 1.5, 8.5), ('Cubs', 'Cardinals'): (None, 8.0, None, 8.0)},
+    'betmgm': {('Mets', 'Braves'): (1.5, None, -1.5, None), ('Mariners', 'Athletics'): (-1.5, 7.5, 1.5, None)},
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def check_backend_parity():
+    # Both parsing backends must give identical games on every fixture
+    failures = 0
+    for site, names in FIXTURES.items():
+        for name in names:
+            html = load_fixture(name)
+            expected = briansnake.parse_page(site, html, backend='bs4')
+            got = briansnake.parse_page(site, html, backend='lxml')
+            ok = expected == got
+            failures += not ok
+            print(f"{'ok' if ok else 'MISMATCH':9}backend parity  {site:11} {name}")
+            if not ok:
+                print(f"    bs4:  {expected}")
+                print(f"    lxml: {got}")
+    return failures
+
+
+def moneylines(games):
+    return [(g.team1, g.team2, g.prices[2], g.prices[5]) for g in games]
+
+
+def expected_feed_moneylines(site, pushed=True):
+    # The page's moneylines, with the pushes applied
+    page, _, _ = FEED_FIXTURES[site]
+    moves = FEED_PUSHED.get(site, {}) if pushed else {}
+    return [(t1, t2) + moves.get((t1, t2), (p1, p2))
+            for t1, t2, p1, p2 in moneylines(briansnake.parse_page(site, load_fixture(page)))]
+
+
+def report(ok, label, site, name, expected, got):
+    print(f"{'ok' if ok else 'MISMATCH':9}{label:15}{site:11} {name}")
+    if not ok:
+        print(f"    expected: {expected}")
+        print(f"    got:      {got}")
+
+
+def check_alignment():
+    # Every book's games aligned onto DraftKings must carry the reference team
+    # order, with each team's own moneyline, including the games a book lists
+    # the other way round
+    failures = 0
+    games_dk = briansnake.parse_page('draftkings', load_fixture('draftkings.html'))
+    for site in ('betmgm', 'fanduel'):
+        games = briansnake.parse_page(site, load_fixture(f'{site}.html'))
+        prices = {}  # team -> its moneyline on this book's page
+        for game in games:
+            prices[game.team1], prices[game.team2] = game.prices[2], game.prices[5]
+        aligned = briansnake.align_books(games_dk, {site: games})[0][site]
+        for ref, game in zip(games_dk, aligned):
+            if game is None:
+                continue
+            expected = (ref.team1, ref.team2, prices[ref.team1], prices[ref.team2])
+            got = (game.team1, game.team2, game.prices[2], game.prices[5])
+            ok = expected == got
+            failures += not ok
+            report(ok, 'alignment', site, f'{ref.team1} vs {ref.team2}', expected, got)
+    return failures
+
+
+def check_line_parsing():
+    # Spread and total points must be read next to their prices, in both backends
+    failures = 0
+    for site, games in FIXTURE_LINES.items():
+        for backend in ('bs4', 'lxml'):
+            parsed = {(g.team1, g.team2): g for g in briansnake.parse_page(site, load_fixture(f'{site}.html'), backend)}
+            for teams, expected in games.items():
+                game = parsed.get(teams)
+                got = game and tuple(None if line != line else line for line in (game.lines[i] for i in (0, 1, 3, 4)))
+                ok = expected == got
+                failures += not ok
+                report(ok, 'lines', site, f"{backend} {' vs '.join(teams)}", expected, got)
+    return failures
+
+
+def check_feed_decoding():
+    # Decoding a book's feed must give the moneylines scraped from the page it rendered
+    failures = 0
+    for site, (_, feed, pushes) in FEED_FIXTURES.items():
+        for pushed in (False, True):
+            if pushed and not pushes:
+                continue
+            page = briansnake.page_key(site, 'check')
+            briansnake.reset_feed(page)
+            payloads = [load_fixture(feed)] + (list(map(load_fixture, pushes)) if pushed else [])
+            got = moneylines(briansnake.feed_games(briansnake.decode_feed(page, payloads)))
+            expected = expected_feed_moneylines(site, pushed)
+            ok = expected == got
+            failures += not ok
+            report(ok, 'feed decoding', site, feed + (' + pushes' if pushed else ''), expected, got)
+            briansnake.reset_feed(page)
+    return failures
+
+
+def serve_fixtures():
+    # Serve fixtures/ on a free local port; returns (server, base_url)
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=FIXTURES_DIR)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def start_headless_chrome(network_capture=False):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    chrome_options = Options()
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    if network_capture:
+        briansnake.enable_network_capture(chrome_options)
+    try:
+        return webdriver.Chrome(options=chrome_options)
+    except Exception as e:
+        print(f"{'skipped':9}headless Chrome unavailable: {str(e).splitlines()[0]}")
+        return None
+
+
+def check_browser_extraction():
+    # JS_EXTRACTORS run in headless Chrome must match parsing the same DOM in Python
+    driver = start_headless_chrome()
+    if driver is None:
+        return 0
+    server, base_url = serve_fixtures()
+    failures = 0
+    try:
+        for site, names in FIXTURES.items():
+            for name in names:
+                driver.get(f'{base_url}/{name}')
+                got = briansnake.from_browser_extract(site, briansnake.extract_in_browser(driver, site))
+                expected = briansnake.parse_page(site, driver.page_source, backend='bs4')
+                ok = expected == got
+                failures += not ok
+                print(f"{'ok' if ok else 'MISMATCH':9}in-browser     {site:11} {name}")
+                if not ok:
+                    print(f"    page_source: {expected}")
+                    print(f"    browser:     {got}")
+    finally:
+        driver.quit()
+        server.shutdown()
+    return failures
+
+
+def check_fingerprint():
+    # A page whose only change is a run line or total must fingerprint
+    # differently, or the scrape skips it as unchanged and keeps the old line
+    driver = start_headless_chrome()
+    if driver is None:
+        return 0
+    server, base_url = serve_fixtures()
+    try:
+        driver.get(f'{base_url}/draftkings.html')
+        before = briansnake.page_fingerprint(driver, 'draftkings')
+        # O 8.5 -> O 9 on the first total, prices untouched
+        driver.execute_script(
+            "document.querySelectorAll('.sportsbook-outcome-cell__line')[1].textContent = '9';")
+        after = briansnake.page_fingerprint(driver, 'draftkings')
+        ok = before is not None and after is not None and before != after
+        print(f"{'ok' if ok else 'MISMATCH':9}fingerprint    draftkings  line change -> {before} != {after}")
+    finally:
+        driver.quit()
+        server.shutdown()
+    return 0 if ok else 1
+
+
+def check_network_capture():
+    # 'network' mode end to end: feed_page.html stands in for a book's front end
+    # and fetches the fixture feed and pushes; read_feed must pick them up from
+    # Chrome's performance log
+    driver = start_headless_chrome(network_capture=True)
+    if driver is None:
+        return 0
+    server, base_url = serve_fixtures()
+    modes = dict(briansnake.EXTRACT_MODES)
+    briansnake.EXTRACT_MODES.update({site: 'network' for site in FEED_FIXTURES})
+    failures = 0
+    try:
+        for site, (_, feed, pushes) in FEED_FIXTURES.items():
+            page = briansnake.page_key(site, 'check')
+            query = '&'.join([f'feed=/{feed}'] + [f'push=/{push}' for push in pushes])
+            driver.get(f'{base_url}/feed_page.html?{query}')
+            briansnake.page_tabs[page] = ('check', driver.current_window_handle)
+            deadline = time.monotonic() + 10
+            while not driver.execute_script("return document.body.getAttribute('data-loaded')"):
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.1)
+            time.sleep(0.2)  # let the last loadingFinished reach the log
+            got = moneylines(briansnake.feed_games(briansnake.decode_feed(page, briansnake.read_feed(driver, page))))
+            expected = expected_feed_moneylines(site)
+            ok = expected == got
+            failures += not ok
+            report(ok, 'network mode', site, feed, expected, got)
+            briansnake.page_tabs.pop(page, None)
+            briansnake.reset_feed(page)
+    finally:
+        briansnake.EXTRACT_MODES.clear()
+        briansnake.EXTRACT_MODES.update(modes)
+        driver.quit()
+        server.shutdown()
+    return failures
+
+
+CHECKS = [check_backend_parity, check_alignment, check_line_parsing, check_browser_extraction, check_fingerprint,
+          check_feed_decoding, check_network_capture]
+
+if __name__ == '__main__':
+    failed = sum(check() for check in CHECKS)
+    print(f"\n{failed} failure(s)")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,171 @@
+# Load test for the HTTP serving path.
+#
+# Serves create_app() with the production server (make_server) on a local
+# port, publishes snapshots of synthetic games like the scraper would, and
+# hits /odds_json from hundreds of concurrent keep-alive clients. Reports
+# throughput and p50/p90/p99 latency. Nothing here launches Chrome.
+#
+# --streams keeps that many dashboards on /stream meanwhile, to check that
+# open streams (each holds a server thread) don't starve the pollers.
+#
+#   python loadtest.py                              # 200 clients, 10 s, 100 games
+#   python loadtest.py --clients 500 --games 1000
+#   python loadtest.py --conditional --gzip         # how the bots poll
+#   python loadtest.py --url http://host:5000       # against a running server
+#   python loadtest.py --streams 100                # polls while 100 dashboards stream
+import argparse
+import http.client
+import socket
+import statistics
+import threading
+import time
+import urllib.parse
+
+import briansnake
+import bench
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def publish_loop(games, interval, stop):
+    # Stand-in for the scraper: move one price and publish a new snapshot every interval
+    i = 0
+    while not stop.wait(interval):
+        game = games[i % len(games)]
+        prices = dict(game['prices'], dk1=game['prices']['dk1'] + 1)
+        games[i % len(games)] = dict(game, prices=prices, dk1=briansnake.format_american(prices['dk1']))
+        briansnake.publish_snapshot(games)
+        i += 1
+
+
+def client(host, port, path, args, deadline, latencies, statuses):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etag = None
+    while time.perf_counter() < deadline:
+        headers = {}
+        if args.gzip:
+            headers['Accept-Encoding'] = 'gzip'
+        if args.conditional and etag:
+            headers['If-None-Match'] = etag
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            statuses['error'] = statuses.get('error', 0) + 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        etag = response.getheader('ETag') or etag
+    conn.close()
+
+
+def stream_client(host, port, streams, sockets):
+    # One dashboard: holds /stream open, counting the events pushed, until run()
+    # shuts its socket down
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.connect()
+        sockets.append(conn.sock)  # the response keeps reading it after conn lets go
+        conn.request('GET', '/stream')
+        response = conn.getresponse()
+    except (OSError, http.client.HTTPException):
+        streams['error'] += 1
+        conn.close()
+        return
+    if response.status != 200:
+        response.read()
+        streams['refused'] += 1
+        conn.close()
+        return
+    streams['open'] += 1
+    while True:
+        try:
+            line = response.fp.readline()
+        except OSError:
+            break
+        if not line:
+            break  # shut down by run()
+        if line.startswith(b'event:'):
+            streams['events'] += 1
+    response.close()
+
+
+def run(args):
+    stop = threading.Event()
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        pages = bench.pages_for(args.games)
+        results = {site: briansnake.parse_page(site, html) for name, (site, html) in pages.items()
+                   if name != 'fanduel_fallback'}
+        games, _, arbs = briansnake.build_moneyline_games(results)
+        briansnake.publish_snapshot(games, arbs)
+        host, port = '127.0.0.1', args.port
+        serve_forever, shutdown = briansnake.make_server(briansnake.create_app(), host, port)
+        threading.Thread(target=serve_forever, daemon=True).start()
+        if args.publish_interval:
+            threading.Thread(target=publish_loop, args=(list(games), args.publish_interval, stop), daemon=True).start()
+        time.sleep(0.5)
+
+    latencies, statuses = [], {}
+    streams = {'open': 0, 'refused': 0, 'error': 0, 'events': 0}
+    sockets = []
+    streamers = [threading.Thread(target=stream_client, args=(host, port, streams, sockets))
+                 for _ in range(args.streams)]
+    for t in streamers:
+        t.start()
+    if streamers:
+        time.sleep(0.5)  # let the streams take their threads before the polling starts
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(host, port, args.path, args, deadline, latencies, statuses))
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    for sock in sockets:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)  # wakes the stream's blocked read
+        except OSError:
+            pass  # already closed (refused)
+    for t in streamers:
+        t.join()
+    stop.set()
+    if not args.url:
+        shutdown()
+
+    latencies.sort()
+    print(f'{args.clients} clients, {elapsed:.1f} s, {len(latencies)} requests, {len(latencies) / elapsed:.0f} req/s')
+    print(f'statuses: {statuses}')
+    if args.streams:
+        print(f'streams: {streams}')
+    if latencies:
+        print(f'p50 {percentile(latencies, 0.50) * 1000:.1f} ms  p90 {percentile(latencies, 0.90) * 1000:.1f} ms  '
+              f'p99 {percentile(latencies, 0.99) * 1000:.1f} ms  max {latencies[-1] * 1000:.1f} ms  '
+              f'mean {statistics.fmean(latencies) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent /odds_json load test')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    parser.add_argument('--games', type=int, default=100, help='synthetic games in the snapshot')
+    parser.add_argument('--path', default='/odds_json')
+    parser.add_argument('--gzip', action='store_true', help='send Accept-Encoding: gzip')
+    parser.add_argument('--conditional', action='store_true', help='send If-None-Match with the last ETag')
+    parser.add_argument('--streams', type=int, default=0, help='dashboards holding /stream open meanwhile')
+    parser.add_argument('--publish-interval', type=float, default=3, help='seconds between snapshots, 0 for none')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    run(parser.parse_args())
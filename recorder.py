@@ -0,0 +1,118 @@
+# Append-only archive of everything the scraper reads from the books.
+#
+# Every read that produced new data (a page_source, a 'browser' extraction or a
+# batch of 'network' feed payloads) is appended as one JSON line to a gzip file
+# per page per day:
+#
+#   <directory>/2026-10-18/draftkings_mlb.jsonl.gz
+#   {"at": 1792300000.12, "cycle": 4711, "page": "draftkings:mlb", "mode": "page_source", "data": "<html>..."}
+#
+# As with the tick store, the scrape threads only queue lines; a background
+# writer compresses them and flushes every FLUSH_INTERVAL. Each flush ends on a
+# gzip sync point, so a crash loses at most the last batch, and a restart
+# appends a new gzip member to the same file. replay.py reads the archives back.
+import datetime
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+
+FLUSH_INTERVAL = 1.0  # seconds the writer waits to fill a batch
+
+
+def archive_name(page):
+    return page.replace(':', '_') + '.jsonl.gz'
+
+
+def read_archive(path):
+    # Entries of one archive file, oldest first. A file cut short by a crash
+    # yields everything up to its last complete line.
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def load_archives(directory, pages=None):
+    # {page: [entry]} for every archive under directory (a day or a whole recording tree)
+    archives = {}
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith('.jsonl.gz'):
+                continue
+            for entry in read_archive(os.path.join(root, name)):
+                if pages is None or entry['page'] in pages:
+                    archives.setdefault(entry['page'], []).append(entry)
+    for entries in archives.values():
+        entries.sort(key=lambda entry: entry['at'])
+    return archives
+
+
+class Recorder:
+    def __init__(self, directory):
+        self.directory = directory
+        self.queue = queue.Queue()
+        self.files = {}  # (day, page) -> open gzip file, owned by the writer
+        self.stats = {'queued': 0, 'written': 0, 'bytes': 0, 'last_flush_ms': 0.0}
+        self.stopped = threading.Event()
+        self.writer = threading.Thread(target=self.write_loop, name='recorder', daemon=True)
+        self.writer.start()
+
+    def record(self, page, mode, data, at=None, cycle=None):
+        # Called from scrape workers; never touches disk
+        at = time.time() if at is None else at
+        self.queue.put({'at': at, 'cycle': cycle, 'page': page, 'mode': mode, 'data': data})
+        self.stats['queued'] += 1
+
+    def file_for(self, entry):
+        day = datetime.datetime.fromtimestamp(entry['at'], datetime.timezone.utc).strftime('%Y-%m-%d')
+        key = (day, entry['page'])
+        f = self.files.get(key)
+        if f is None:
+            for old in [k for k in self.files if k[0] != day]:
+                self.files.pop(old).close()  # the day rolled over
+            os.makedirs(os.path.join(self.directory, day), exist_ok=True)
+            f = self.files[key] = gzip.open(os.path.join(self.directory, day, archive_name(entry['page'])), 'at',
+                                            encoding='utf-8')
+        return f
+
+    def write_loop(self):
+        while not (self.stopped.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=FLUSH_INTERVAL)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while time.monotonic() < deadline:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            touched = set()
+            for entry in batch:
+                line = json.dumps(entry, separators=(',', ':')) + '\n'
+                f = self.file_for(entry)
+                f.write(line)
+                touched.add(f)
+                self.stats['bytes'] += len(line)
+            for f in touched:
+                f.flush()
+            self.stats['written'] += len(batch)
+            self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+    def close(self):
+        # Write what is queued, finish every gzip member and stop the writer
+        self.stopped.set()
+        self.writer.join()
@@ -0,0 +1,265 @@
+# Replay archives written by recorder.py (run briansnake with RECORD_DIR set).
+#
+# Live replay swaps Chrome for ReplayDriver, which answers the scraper's reads
+# from the archive as of a replay clock, and runs the real pipeline: the
+# scheduler, supervision, parsing, alignment, the 3-way blocks and the HTTP
+# server. Point a browser or loadtest.py --url at it. At --speed above 1 the
+# scheduler still polls on wall-clock intervals, so changes closer together
+# than a poll are seen together, as they would be live.
+#
+# --fast backtests instead: every recorded read is applied in order, grouped by
+# the scrape cycle it came from, as fast as possible. It reports per-cycle
+# processing time (the slowest cycles are the ones to profile) and every arb
+# that opened, with how long it stayed open in market time.
+#
+#   python replay.py recordings/2026-10-18                 # real time on SERVE_PORT
+#   python replay.py recordings/2026-10-18 --speed 20 --ticks replay.db  # with /history, /lines
+#   python replay.py recordings/2026-10-18 --fast --ticks backtest.db
+import argparse
+import bisect
+import datetime
+import itertools
+import json
+import statistics
+import threading
+import time
+import types
+
+import briansnake
+from recorder import load_archives
+from tickstore import TickStore
+
+BLANK_PAGE = '<html><body></body></html>'
+
+
+class ReplayClock:
+    # Archive time, running `speed` times faster than the wall clock from `start`
+    def __init__(self, start, speed=1.0):
+        self.start = start
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def now(self):
+        return self.start + (time.monotonic() - self.started) * self.speed
+
+
+class ReplaySwitch:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind='tab'):
+        self.driver.open_handle()
+
+    def window(self, handle):
+        if handle not in self.driver.tabs:
+            raise LookupError(f'no such window: {handle}')
+        self.driver.current_window_handle = handle
+
+
+class ReplayDriver:
+    # Enough of a Chrome WebDriver for briansnake's persistent drivers: one tab
+    # per page, each showing the page's latest archived read at clock.now()
+    handles = itertools.count()
+
+    def __init__(self, archives, clock):
+        self.archives = archives
+        self.times = {page: [entry['at'] for entry in entries] for page, entries in archives.items()}
+        self.clock = clock
+        self.pages = {briansnake.page_url(page): page for page in archives}
+        self.tabs = {}  # handle -> page (None before the first get)
+        self.delivered = {}  # handle -> archive entries of a 'network' page already sent as frames
+        self.switch_to = ReplaySwitch(self)
+        self.service = types.SimpleNamespace(process=None)
+        self.current_window_handle = None
+        self.open_handle()
+
+    def open_handle(self):
+        self.current_window_handle = f'replay-{next(self.handles)}'
+        self.tabs[self.current_window_handle] = None
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    def current_entry(self, page):
+        # Index and entry of the page's latest read at clock.now(), or (-1, None)
+        i = bisect.bisect_right(self.times[page], self.clock.now()) - 1
+        return (i, self.archives[page][i]) if i >= 0 else (-1, None)
+
+    def get(self, url):
+        self.tabs[self.current_window_handle] = self.pages[url]
+        self.delivered[self.current_window_handle] = 0
+
+    def refresh(self):
+        # A reload refetches the whole feed
+        self.delivered[self.current_window_handle] = 0
+
+    def close(self):
+        self.tabs.pop(self.current_window_handle, None)
+
+    def quit(self):
+        self.tabs.clear()
+
+    def find_element(self, by, selector):
+        return self  # the odds are always "rendered"
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def execute_script(self, script, *args):
+        page = self.tabs[self.current_window_handle]
+        if script == briansnake.FINGERPRINT_JS:
+            return f'replay:{self.current_entry(page)[0]}'
+        if 'readyState' in script:
+            return 'complete'
+        _, entry = self.current_entry(page)
+        if entry is None or entry['mode'] != 'browser':
+            return {'teams': [], 'odds': []}
+        return entry['data']
+
+    @property
+    def page_source(self):
+        _, entry = self.current_entry(self.tabs[self.current_window_handle])
+        return entry['data'] if entry is not None and entry['mode'] == 'page_source' else BLANK_PAGE
+
+    def get_log(self, kind):
+        # Archived 'network' payloads that came due since the last call, as
+        # WebSocket frames on a socket registered for each tab's page
+        log = []
+        for handle, page in self.tabs.items():
+            if page is None or briansnake.EXTRACT_MODES.get(briansnake.book_of(page)) != 'network':
+                continue
+            request_id = f'{handle}-feed'
+            briansnake.feed_sockets[request_id] = page
+            i, _ = self.current_entry(page)
+            for entry in self.archives[page][self.delivered[handle]:i + 1]:
+                for payload in entry['data']:
+                    log.append({'message': json.dumps({'webview': handle, 'message': {
+                        'method': 'Network.webSocketFrameReceived',
+                        'params': {'requestId': request_id, 'response': {'opcode': 1, 'payloadData': payload}},
+                    }})})
+            self.delivered[handle] = max(self.delivered[handle], i + 1)
+        return log
+
+
+def configure(archives):
+    # Leagues and extract modes as recorded (each book's last recorded mode)
+    briansnake.ACTIVE_LEAGUES[:] = sorted({briansnake.league_of(page) for page in archives})
+    for page, entries in archives.items():
+        briansnake.EXTRACT_MODES[briansnake.book_of(page)] = entries[-1]['mode']
+
+
+def games_from_entry(entry):
+    page, mode, data = entry['page'], entry['mode'], entry['data']
+    book = briansnake.book_of(page)
+    if mode == 'network':
+        return briansnake.feed_games(briansnake.decode_feed(page, data))
+    if mode == 'browser':
+        return briansnake.from_browser_extract(book, data)
+    return briansnake.parse_source(book, data)
+
+
+def recorded_cycles(archives):
+    # Entries of every page in time order, grouped by the scrape cycle that read them
+    entries = sorted((entry for page_entries in archives.values() for entry in page_entries),
+                     key=lambda entry: entry['at'])
+    key = lambda entry: entry['cycle'] if entry['cycle'] is not None else entry['at']
+    return [list(group) for _, group in itertools.groupby(entries, key=key)]
+
+
+def stamp(at):
+    return datetime.datetime.fromtimestamp(at).strftime('%H:%M:%S')
+
+
+def backtest(archives, ticks=None):
+    configure(archives)
+    if ticks:
+        briansnake.tick_store = TickStore(ticks)
+    open_arbs = {}  # (league, team1, team2, market) -> (opened at, best margin)
+    closed = []
+    timings = []
+    start = time.perf_counter()
+    for cycle in recorded_cycles(archives):
+        at = cycle[-1]['at']
+        cycle_start = time.perf_counter()
+        for entry in cycle:
+            briansnake.book_results[entry['page']] = games_from_entry(entry)
+        published = briansnake.rebuild_leagues(briansnake.book_results, {entry['page'] for entry in cycle}, at)
+        timings.append((time.perf_counter() - cycle_start, at, [entry['page'] for entry in cycle]))
+        if not published:
+            continue
+        now_open = {(arb['league'], arb['team1'], arb['team2'], arb['market']): arb['margin']
+                    for arb in briansnake.get_snapshot().arbs}
+        for key in list(open_arbs):
+            if key not in now_open:
+                opened, margin = open_arbs.pop(key)
+                closed.append((key, opened, at, margin))
+        for key, margin in now_open.items():
+            opened, best = open_arbs.get(key, (at, margin))
+            open_arbs[key] = (opened, max(best, margin))
+    end = max(entry['at'] for entries in archives.values() for entry in entries)
+    closed += [(key, opened, end, margin) for key, (opened, margin) in open_arbs.items()]
+    report(timings, closed, time.perf_counter() - start)
+    if briansnake.tick_store is not None:
+        briansnake.tick_store.close()
+
+
+def report(timings, arbs, elapsed):
+    ms = sorted(t * 1000 for t, _, _ in timings)
+    reads = sum(len(pages) for _, _, pages in timings)
+    print(f'{len(timings)} cycles, {reads} reads replayed in {elapsed:.1f} s, '
+          f'snapshot version {briansnake.get_snapshot().version}')
+    if ms:
+        print(f'cycle p50 {statistics.median(ms):.1f} ms  p99 {ms[min(len(ms) - 1, int(0.99 * len(ms)))]:.1f} ms  '
+              f'max {ms[-1]:.1f} ms')
+        print('slowest cycles:')
+        for t, at, pages in sorted(timings, reverse=True)[:5]:
+            print(f'  {stamp(at)}  {t * 1000:8.1f} ms  {", ".join(pages)}')
+    print(f'{len(arbs)} arbs opened')
+    for (league, team1, team2, market), opened, closed_at, margin in sorted(arbs, key=lambda arb: arb[1]):
+        print(f'  {stamp(opened)}  {league:4} {team1} vs {team2} {market}: up to {margin * 100:.2f}% '
+              f'for {closed_at - opened:.0f} s')
+
+
+def replay_live(archives, speed, host, port, ticks=None):
+    configure(archives)
+    if ticks:
+        briansnake.tick_store = TickStore(ticks)
+    first = max(entries[0]['at'] for entries in archives.values())  # once every page has loaded
+    last = max(entries[-1]['at'] for entries in archives.values())
+    clock = ReplayClock(first, speed)
+    briansnake.new_driver = lambda profile=None, network_capture=False: ReplayDriver(archives, clock)
+    briansnake.start_persistent_drivers(list(archives))
+    threading.Thread(target=briansnake.scrape_and_update_tables, daemon=True).start()
+    serve_forever, shutdown = briansnake.make_server(briansnake.create_app(), host, port)
+    threading.Thread(target=serve_forever, daemon=True).start()
+    print(f'replaying {stamp(first)}-{stamp(last)} at x{speed} on http://{host}:{port}')
+    try:
+        while clock.now() < last + briansnake.MAX_INTERVAL * speed:
+            time.sleep(10)
+            print(f'  {stamp(min(clock.now(), last))}  snapshot {briansnake.get_snapshot().version}  '
+                  f'cycles {briansnake.cycle_timings["cycles"]}  last {briansnake.cycle_timings["last"] * 1000:.1f} ms')
+    finally:
+        shutdown()
+        briansnake.close_persistent_drivers()
+        if briansnake.tick_store is not None:
+            briansnake.tick_store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded sportsbook reads')
+    parser.add_argument('directory', help='a day directory written by the recorder, or the whole recording tree')
+    parser.add_argument('--fast', action='store_true', help='backtest every recorded read as fast as possible')
+    parser.add_argument('--speed', type=float, default=1.0, help='live replay speed multiplier')
+    parser.add_argument('--pages', help="comma-separated 'book:league' pages to replay (default: all)")
+    parser.add_argument('--ticks', help='record quote history to this SQLite file, which a live replay also serves')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=briansnake.SERVE_PORT)
+    args = parser.parse_args()
+    archives = load_archives(args.directory, args.pages.split(',') if args.pages else None)
+    if not archives:
+        parser.error(f'no archives under {args.directory}')
+    if args.fast:
+        backtest(archives, args.ticks)
+    else:
+        replay_live(archives, args.speed, args.host, args.port, args.ticks)
@@ -0,0 +1,324 @@
+# Append-only history of every moneyline quote change, in SQLite (WAL mode).
+#
+# The scraper thread only hands each cycle's games to record(), which diffs them
+# against the last known price per (game, book, side) and queues the changes.
+# A background writer commits the queue in batches, so scraping never waits on
+# disk. Readers get their own connection per thread and, thanks to WAL, never
+# block the writer.
+#
+# Ticks are keyed (game, book, side, time) in a WITHOUT ROWID table, so one
+# game's history is a single range scan however many months are stored.
+#
+# A game is (league, day, team1, team2, n): the pages carry no start time or
+# event id that every book shares, so the day is the local date the game is
+# quoted on and n its position among that matchup's games on the page, as
+# align_books pairs doubleheaders. A game listed days ahead therefore gets one
+# row per day it is quoted; two different games never share one. Since no
+# quote is filed under a past day, only today's and yesterday's last prices
+# are kept in memory for the diff.
+import logging
+import queue
+import sqlite3
+import statistics
+import threading
+import time
+
+FLUSH_INTERVAL = 1.0  # seconds the writer waits to fill a batch
+MAX_BATCH = 5000  # ticks per transaction
+MOVE_WINDOW = 300  # seconds a book has to follow another book's move to count as following it
+
+log = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    league TEXT NOT NULL,
+    day TEXT NOT NULL,
+    team1 TEXT NOT NULL,
+    team2 TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    UNIQUE (league, day, team1, team2, n)
+);
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS ticks (
+    game_id INTEGER NOT NULL,
+    book_id INTEGER NOT NULL,
+    side INTEGER NOT NULL,
+    at REAL NOT NULL,
+    price INTEGER NOT NULL,
+    PRIMARY KEY (game_id, book_id, side, at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ticks_at ON ticks (at);
+CREATE INDEX IF NOT EXISTS games_teams ON games (team1, team2);
+CREATE INDEX IF NOT EXISTS games_day ON games (day);
+'''
+
+# Databases from before games were told apart by league, day and position kept
+# one row per matchup. The ids (and so the ticks) carry over, filed under the
+# day they were first seen.
+MIGRATE_GAMES = '''
+ALTER TABLE games RENAME TO games_by_matchup;
+CREATE TABLE games (
+    id INTEGER PRIMARY KEY,
+    league TEXT NOT NULL,
+    day TEXT NOT NULL,
+    team1 TEXT NOT NULL,
+    team2 TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    UNIQUE (league, day, team1, team2, n)
+);
+INSERT INTO games (id, league, day, team1, team2, n, first_seen)
+    SELECT id, '', date(first_seen, 'unixepoch', 'localtime'), team1, team2, 0, first_seen FROM games_by_matchup;
+DROP TABLE games_by_matchup;
+'''
+
+
+def canonical(team1, team2, price1, price2):
+    # Books list the same matchup in either order; store it alphabetically so
+    # side 0 is always the same team
+    team1, team2 = team1.strip(), team2.strip()
+    if team1 <= team2:
+        return team1, team2, price1, price2
+    return team2, team1, price2, price1
+
+
+def game_day(at):
+    # The local date a quote was taken, which files it under that day's game
+    return time.strftime('%Y-%m-%d', time.localtime(at))
+
+
+def recent_days(at):
+    # The days whose last prices the diff keeps: the quote's and the one before
+    return game_day(at), game_day(at - 86400)
+
+
+class TickStore:
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.last_prices = {}  # (league, day, team1, team2, n, book, side) -> price, owned by the recording thread
+        self.days = recent_days(time.time())  # days last_prices holds
+        self.local = threading.local()
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'last_flush_ms': 0.0,
+                      'failed_batches': 0, 'dropped': 0, 'last_error': None}
+        self.stopped = threading.Event()
+        conn = self.connect()
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(games)')]
+        if columns and 'league' not in columns:
+            conn.executescript(MIGRATE_GAMES)
+        conn.executescript(SCHEMA)
+        self.load_last_prices(conn)
+        conn.close()
+        self.writer = threading.Thread(target=self.write_loop, name='tickstore', daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reader(self):
+        # One read connection per thread (Flask handlers run on many)
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+        return conn
+
+    def load_last_prices(self, conn):
+        # Resume diffing from what is already on disk, so a restart doesn't
+        # write every quote again. Only recent days' games are read, each a
+        # range scan of its ticks (CROSS JOIN keeps games as the outer loop);
+        # SQLite returns the price of the MAX(at) row.
+        rows = conn.execute('''
+            SELECT g.league, g.day, g.team1, g.team2, g.n, b.name, t.side, t.price, MAX(t.at)
+            FROM games g CROSS JOIN ticks t ON t.game_id = g.id JOIN books b ON b.id = t.book_id
+            WHERE g.day >= ?
+            GROUP BY t.game_id, t.book_id, t.side
+        ''', (min(self.days),))
+        for league, day, team1, team2, n, book, side, price, _ in rows:
+            self.last_prices[league, day, team1, team2, n, book, side] = price
+
+    def roll_days(self, at):
+        # On a new day, forget the last prices of days no quote is filed under any more
+        days = recent_days(at)
+        if days != self.days:
+            self.days = days
+            self.last_prices = {key: price for key, price in self.last_prices.items() if key[1] in days}
+
+    def record(self, results, league, at=None):
+        # results: {site: [Game]} for one league. Queues the quotes that changed;
+        # never touches disk.
+        at = time.time() if at is None else at
+        self.roll_days(at)
+        day = game_day(at)
+        changes = []
+        for book, games in results.items():
+            positions = {}  # matchup -> games of it seen so far on this page
+            for game in games:
+                team1, team2, price1, price2 = canonical(game.team1, game.team2, game.prices[2], game.prices[5])
+                n = positions[team1, team2] = positions.get((team1, team2), -1) + 1
+                for side, price in ((0, price1), (1, price2)):
+                    key = (league, day, team1, team2, n, book, side)
+                    if price and self.last_prices.get(key) != price:
+                        self.last_prices[key] = price
+                        changes.append((league, day, team1, team2, n, book, side, at, price))
+        if changes:
+            self.queue.put(changes)
+            self.stats['queued'] += len(changes)
+        return len(changes)
+
+    def write_loop(self):
+        conn = self.connect()
+        game_ids, book_ids = {}, {}
+        while not (self.stopped.is_set() and self.queue.empty()):
+            try:
+                batch = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < MAX_BATCH and time.monotonic() < deadline:
+                try:
+                    batch.extend(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            try:
+                with conn:
+                    rows = []
+                    for league, day, team1, team2, n, book, side, at, price in batch:
+                        game = (league, day, team1, team2, n)
+                        game_id = game_ids.get(game)
+                        if game_id is None:
+                            conn.execute('INSERT OR IGNORE INTO games (league, day, team1, team2, n, first_seen) '
+                                         'VALUES (?, ?, ?, ?, ?, ?)', game + (at,))
+                            game_id = game_ids[game] = conn.execute(
+                                'SELECT id FROM games '
+                                'WHERE league = ? AND day = ? AND team1 = ? AND team2 = ? AND n = ?',
+                                game).fetchone()[0]
+                        book_id = book_ids.get(book)
+                        if book_id is None:
+                            conn.execute('INSERT OR IGNORE INTO books (name) VALUES (?)', (book,))
+                            book_id = book_ids[book] = conn.execute(
+                                'SELECT id FROM books WHERE name = ?', (book,)).fetchone()[0]
+                        rows.append((game_id, book_id, side, at, price))
+                    conn.executemany('INSERT OR REPLACE INTO ticks (game_id, book_id, side, at, price) '
+                                     'VALUES (?, ?, ?, ?, ?)', rows)
+            except sqlite3.Error as e:
+                # Keep the writer alive for the next batches. The rollback may
+                # have undone games or books whose ids are cached.
+                log.exception('tickstore: dropped a batch of %d ticks', len(batch))
+                game_ids.clear()
+                book_ids.clear()
+                self.stats['failed_batches'] += 1
+                self.stats['dropped'] += len(batch)
+                self.stats['last_error'] = str(e)
+                continue
+            self.stats['written'] += len(rows)
+            self.stats['batches'] += 1
+            self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+        conn.close()
+
+    def close(self):
+        # Flush whatever is queued and stop the writer
+        self.stopped.set()
+        self.writer.join()
+
+    def find_game(self, team1, team2, league=None, day=None, n=0):
+        # Id of the latest game of a matchup (the n-th of its day), narrowed to a
+        # league and day when given; None if it was never quoted
+        sql = 'SELECT id FROM games WHERE team1 = ? AND team2 = ? AND n = ?'
+        params = [team1, team2, n]
+        if league is not None:
+            sql += ' AND league = ?'
+            params.append(league)
+        if day is not None:
+            sql += ' AND day = ?'
+            params.append(day)
+        row = self.reader().execute(sql + ' ORDER BY day DESC, first_seen DESC LIMIT 1', params).fetchone()
+        return row and row[0]
+
+    def history(self, team1, team2, book=None, since=None, until=None, league=None, day=None, n=0):
+        # Every price change for one game of a matchup (see find_game), oldest
+        # first, as {'book', 'team', 'price', 'at'} dicts
+        team1, team2, _, _ = canonical(team1, team2, 0, 0)
+        sql = '''
+            SELECT b.name, t.side, t.price, t.at
+            FROM ticks t JOIN books b ON b.id = t.book_id
+            WHERE t.game_id = ?'''
+        params = [self.find_game(team1, team2, league, day, n)]
+        if book is not None:
+            sql += ' AND b.name = ?'
+            params.append(book)
+        if since is not None:
+            sql += ' AND t.at >= ?'
+            params.append(since)
+        if until is not None:
+            sql += ' AND t.at < ?'
+            params.append(until)
+        sql += ' ORDER BY t.at, b.name, t.side'
+        teams = (team1, team2)
+        return [{'book': name, 'team': teams[side], 'price': price, 'at': at}
+                for name, side, price, at in self.reader().execute(sql, params)]
+
+    def opening_and_current(self, team1, team2, league=None, day=None, n=0):
+        # {book: {team: {'open', 'opened_at', 'current', 'moved_at', 'moves'}}}
+        # for one game of a matchup (see find_game)
+        team1, team2, _, _ = canonical(team1, team2, 0, 0)
+        rows = self.reader().execute('''
+            SELECT b.name, t.side, MIN(t.at), MAX(t.at), COUNT(*) - 1,
+                   (SELECT price FROM ticks WHERE game_id = t.game_id AND book_id = t.book_id AND side = t.side ORDER BY at LIMIT 1),
+                   (SELECT price FROM ticks WHERE game_id = t.game_id AND book_id = t.book_id AND side = t.side ORDER BY at DESC LIMIT 1)
+            FROM ticks t JOIN books b ON b.id = t.book_id
+            WHERE t.game_id = ?
+            GROUP BY t.game_id, t.book_id, t.side
+        ''', (self.find_game(team1, team2, league, day, n),))
+        teams = (team1, team2)
+        lines = {}
+        for name, side, opened_at, moved_at, moves, opening, current in rows:
+            lines.setdefault(name, {})[teams[side]] = {
+                'open': opening, 'opened_at': opened_at, 'current': current, 'moved_at': moved_at, 'moves': moves,
+            }
+        return lines
+
+    def time_to_move(self, since=None, window=MOVE_WINDOW):
+        # How quickly each book follows a line move. For every price change, the
+        # lag is the time since the first book moved the same side the same way
+        # within `window` seconds; the book that moved first has lag 0.
+        # Returns {book: {'moves', 'led', 'median_lag', 'mean_lag'}}.
+        sql = '''
+            SELECT t.game_id, t.side, b.name, t.at, t.price
+            FROM ticks t JOIN books b ON b.id = t.book_id'''
+        params = []
+        if since is not None:
+            sql += ' WHERE t.at >= ?'
+            params.append(since)
+        sql += ' ORDER BY t.game_id, t.side, t.at'
+        lags = {}
+        led = {}
+        current_key = None
+        for game_id, side, book, at, price in self.reader().execute(sql, params):
+            if (game_id, side) != current_key:
+                current_key = (game_id, side)
+                last = {}  # book -> last price on this game/side
+                leaders = {1: None, -1: None}  # direction -> time the current move started
+            previous = last.get(book)
+            last[book] = price
+            if previous is None or previous == price:
+                continue  # opening line for this book
+            direction = 1 if price > previous else -1
+            start = leaders[direction]
+            if start is None or at - start > window:
+                leaders[direction] = start = at
+                led[book] = led.get(book, 0) + 1
+            lags.setdefault(book, []).append(at - start)
+        return {
+            book: {'moves': len(values), 'led': led.get(book, 0),
+                   'median_lag': statistics.median(values), 'mean_lag': statistics.fmean(values)}
+            for book, values in lags.items()
+        }